@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -88,6 +89,18 @@ DATABASES = {
     }
 }
 
+# The category and page-cache generations, cached pages and their locks must
+# be shared by every worker process, so deployments set HABR_REDIS_URL (needs
+# the redis package). Without it each process gets its own LocMemCache, which
+# is only correct when the site runs as a single process.
+if os.environ.get('HABR_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['HABR_REDIS_URL'],
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -130,6 +143,16 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored by content hash and deduplicated (see habr.storage)
+STORAGES = {
+    'default': {'BACKEND': 'habr.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# Uploads stream to a temporary file and are checked while they arrive (see habr.uploads)
+FILE_UPLOAD_HANDLERS = ['habr.uploads.ImageUploadHandler']
+HABR_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+
 LOGIN_URL = '/habr/login/'
 LOGIN_REDIRECT_URL = '/'
 
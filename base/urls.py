@@ -3,6 +3,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from habr.storage import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('habr/', include('habr.urls')),
@@ -11,4 +13,4 @@ urlpatterns = [
 
 # Serve media files in development mode
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
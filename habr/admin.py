@@ -1,8 +1,13 @@
 ﻿from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 
+from . import suggest
 from .models import Category, Article, UserProfile, Bookmark, ArticleRating, Comment, ArticleEditRequest, ArticleDeleteRequest
+from .navigation import invalidate_categories
+from .page_cache import bump_content_generation
+from .search import index_articles, search_ids
 
 User = get_user_model()
 
@@ -40,16 +45,39 @@ class CategoryAdmin(admin.ModelAdmin):
 class ArticleAdmin(admin.ModelAdmin):
     list_display = ("title", "author", "category", "is_approved", "is_published", "created_at")
     list_filter = ("category", "is_approved", "is_published", "created_at")
-    search_fields = ("title", "summary", "content", "author__username")
+    search_fields = ("title", "author__username")
     actions = ['approve_articles', 'reject_articles']
 
+    def get_queryset(self, request):
+        # Soft-deleted articles wait for habr.purge; approving one must not bring it back
+        return super().get_queryset(request).filter(is_deleted=False)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Match summary/content too: published articles through the search index, the rest with LIKE"""
+        matches, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            # The index only holds visible articles; pending and rejected ones are few, so scan just those
+            hidden = queryset.exclude(is_approved=True, is_published=True)
+            for bit in search_term.split():
+                hidden = hidden.filter(Q(summary__icontains=bit) | Q(content__icontains=bit))
+            matches = matches | queryset.filter(pk__in=search_ids(search_term, limit=1000)) | hidden
+        return matches, may_have_duplicates
+
     def approve_articles(self, request, queryset):
         queryset.update(is_approved=True, is_published=True)
+        index_articles(queryset)
+        invalidate_categories()
+        bump_content_generation()
+        suggest.invalidate()
         self.message_user(request, 'Selected articles have been approved.')
     approve_articles.short_description = "Approve selected articles"
 
     def reject_articles(self, request, queryset):
         queryset.update(is_approved=False, is_published=False)
+        index_articles(queryset)
+        invalidate_categories()
+        bump_content_generation()
+        suggest.invalidate()
         self.message_user(request, 'Selected articles have been rejected.')
     reject_articles.short_description = "Reject selected articles"
 
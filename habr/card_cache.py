@@ -0,0 +1,97 @@
+"""Cache of the viewer-independent part of the article list card.
+
+The cached fragment (``habr/article_card_body.html``) holds everything on a
+card except the like/dislike/bookmark buttons, which carry the viewer's own
+state and CSRF token and are rendered per request around it. The key
+includes a version built from every value the fragment shows, so edits and
+rating changes produce a new key instead of needing an invalidation. Likes
+and comments are not on the fragment and leave the key alone.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import reaction_buffer
+
+
+CARD_TEMPLATE = 'habr/article_card_body.html'
+# naturaltime on the card goes stale, so fragments expire even if nothing changed
+CARD_TIMEOUT = getattr(settings, 'HABR_CARD_CACHE_SECONDS', 300)
+
+HITS_KEY = 'habr:card:stats:hits'
+MISSES_KEY = 'habr:card:stats:misses'
+
+
+def card_version(article) -> str:
+    # updated_at covers the title, excerpt and image fields
+    parts = (
+        article.updated_at.isoformat(),
+        article.image_variants.get('source'),
+        article.rating,
+        article.author.username,
+        article.category.name,
+    )
+    return hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def card_key(article) -> str:
+    return f'habr:card:{article.pk}:{card_version(article)}'
+
+
+def attach_cards(articles) -> None:
+    """Set ``card_html`` on each article, rendering and storing only the missing ones"""
+    keys = {card_key(article): article for article in articles}
+    if not keys:
+        return
+    cached = cache.get_many(list(keys))
+    missing = {}
+    for key, article in keys.items():
+        html = cached.get(key)
+        if html is None:
+            html = render_to_string(CARD_TEMPLATE, {'article': article})
+            missing[key] = html
+        article.card_html = mark_safe(html)
+    if missing:
+        cache.set_many(missing, timeout=CARD_TIMEOUT)
+    _count(HITS_KEY, len(keys) - len(missing))
+    _count(MISSES_KEY, len(missing))
+
+
+def _count(key: str, amount: int) -> None:
+    if not amount:
+        return
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, amount)
+
+
+def card_cache_stats() -> dict:
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / lookups if lookups else 0.0,
+    }
+
+
+def reset_card_cache_stats() -> None:
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+class CachedCardsMixin:
+    """ListView mixin that fills ``card_html`` on the page's articles"""
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        for article in context['object_list']:
+            # Same counters as the detail page while the viewer's reactions are queued
+            reaction_buffer.add_own_deltas(article)
+        attach_cards(context['object_list'])
+        return context
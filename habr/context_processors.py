@@ -1,7 +1,6 @@
-from .models import Category
+from .navigation import get_categories
 
 
 def categories(request):
     """Add categories to all templates"""
-    return {'categories': Category.objects.all()}
-
+    return {'categories': get_categories()}
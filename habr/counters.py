@@ -0,0 +1,33 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Article, ArticleRating, Comment
+
+
+def bump(article_pk: int, **deltas: int) -> None:
+    """Apply counter deltas to one article with a single UPDATE"""
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if changes:
+        Article.objects.filter(pk=article_pk).update(**changes)
+
+
+def _subquery(queryset, aggregate):
+    """Correlated per-article aggregate, 0 when there are no rows"""
+    values = queryset.filter(article_id=OuterRef('pk')).order_by().values('article_id')
+    return Coalesce(
+        Subquery(values.annotate(total=aggregate).values('total'), output_field=IntegerField()),
+        Value(0),
+    )
+
+
+def recompute(queryset=None) -> int:
+    """Recalculate stored counters from the source tables in one UPDATE"""
+    if queryset is None:
+        queryset = Article.objects.all()
+    return queryset.update(
+        likes_total=_subquery(Article.likes.through.objects, Count('*')),
+        dislikes_total=_subquery(Article.dislikes.through.objects, Count('*')),
+        rating_sum=_subquery(ArticleRating.objects, Sum('score')),
+        rating_count=_subquery(ArticleRating.objects, Count('*')),
+        comment_count=_subquery(Comment.objects, Count('*')),
+    )
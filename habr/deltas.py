@@ -0,0 +1,87 @@
+"""Compact text deltas for article revisions and edit requests.
+
+A delta is a JSON list of operations applied left to right to the old
+text: an int ``n`` copies the next ``n`` characters, ``'-text'`` skips
+``text`` and ``'+text'`` inserts it. Deleted text is kept so a delta can be
+shown as a diff without loading the text it applies to. Changes are found
+word by word, after trimming the common prefix and suffix, so fixing one
+typo in a long article stores a few dozen bytes.
+"""
+import re
+from difflib import SequenceMatcher
+
+
+_TOKEN_RE = re.compile(r'\s+|\w+|[^\w\s]', re.UNICODE)
+
+
+def _common_prefix(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    size = 0
+    while size < limit and a[size] == b[size]:
+        size += 1
+    return size
+
+
+def make_delta(old: str, new: str) -> list:
+    """Operations turning ``old`` into ``new``"""
+    prefix = _common_prefix(old, new)
+    suffix = _common_prefix(old[prefix:][::-1], new[prefix:][::-1])
+    a = _TOKEN_RE.findall(old[prefix:len(old) - suffix])
+    b = _TOKEN_RE.findall(new[prefix:len(new) - suffix])
+
+    ops = [prefix] if prefix else []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            ops.append(sum(map(len, a[i1:i2])))
+            continue
+        if i2 > i1:
+            ops.append('-' + ''.join(a[i1:i2]))
+        if j2 > j1:
+            ops.append('+' + ''.join(b[j1:j2]))
+    if suffix:
+        ops.append(suffix)
+    return _merge_copies(ops)
+
+
+def _merge_copies(ops: list) -> list:
+    merged = []
+    for op in ops:
+        if isinstance(op, int) and merged and isinstance(merged[-1], int):
+            merged[-1] += op
+        else:
+            merged.append(op)
+    return merged
+
+
+def apply_delta(old: str, ops: list) -> str:
+    """Rebuild the new text; ValueError when ``ops`` was not made against ``old``"""
+    parts, position = [], 0
+    for op in ops:
+        if isinstance(op, int):
+            parts.append(old[position:position + op])
+            position += op
+        elif op.startswith('-'):
+            if not old.startswith(op[1:], position):
+                raise ValueError('delta does not match its base text')
+            position += len(op) - 1
+        else:
+            parts.append(op[1:])
+    if position != len(old):
+        raise ValueError('delta does not match its base text')
+    return ''.join(parts)
+
+
+def fragments(ops: list) -> list:
+    """``[(kind, text)]`` for showing a delta: kind is 'same', 'del' or 'ins'.
+
+    Copied text is not stored in the delta, so it shows as an ellipsis.
+    """
+    shown = []
+    for op in ops:
+        if isinstance(op, int):
+            shown.append(('same', '…'))
+        elif op.startswith('-'):
+            shown.append(('del', op[1:]))
+        else:
+            shown.append(('ins', op[1:]))
+    return shown
@@ -0,0 +1,21 @@
+from .models import Article
+from .viewer_state import with_viewer_state
+
+
+def article_feed(viewer=None, **filters):
+    """Approved, published articles with everything a list card needs in a single query.
+
+    Author and category are joined, the like/dislike/rating/comment numbers
+    come from the stored counters on Article, and the ``summary`` and
+    ``content`` bodies are left out of the SELECT because cards only show the
+    stored ``excerpt``. Passing the
+    requesting user as ``viewer`` adds their like/bookmark flags to each row.
+    """
+    queryset = (
+        Article.objects.filter(is_approved=True, is_published=True, **filters)
+        .select_related('author', 'category')
+        .defer('summary', 'content')
+    )
+    if viewer is not None:
+        queryset = with_viewer_state(queryset, viewer)
+    return queryset
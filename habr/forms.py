@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model
 from django.utils.text import slugify
 
 from .models import Article, Category, UserProfile, ArticleRating
+from .uploads import ACCEPT
 
 User = get_user_model()
 
@@ -22,12 +23,24 @@ class ArticleForm(forms.ModelForm):
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control bg-dark text-white border-secondary'}),
             'category': forms.Select(attrs={'class': 'form-select bg-dark text-white border-secondary'}),
-            'image': forms.FileInput(attrs={'class': 'form-control bg-dark text-white border-secondary', 'accept': 'image/*'}),
+            'image': forms.FileInput(attrs={'class': 'form-control bg-dark text-white border-secondary', 'accept': ACCEPT}),
             'image_url': forms.URLInput(attrs={'class': 'form-control bg-dark text-white border-secondary'}),
             'summary': forms.Textarea(attrs={'class': 'form-control bg-dark text-white border-secondary', 'rows': 3}),
             'content': forms.Textarea(attrs={'class': 'form-control bg-dark text-white border-secondary', 'rows': 10}),
         }
 
+    def __init__(self, *args, upload_errors=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Files the upload handler refused while they were being received
+        self.upload_errors = upload_errors or {}
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, message in self.upload_errors.items():
+            if field in self.fields:
+                self.add_error(field, message)
+        return cleaned_data
+
 
 class CategoryForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,150 @@
+"""Resized derivatives of uploaded article images.
+
+Every uploaded image gets a ``thumb`` (list cards) and a ``medium`` (detail
+page) rendition, each as WebP plus a JPEG fallback (PNG when the source has
+transparency). They are described in ``Article.image_variants``::
+
+    {"source": "articles/shot.png",
+     "thumb": {"width": 480, "height": 270, "files": {"webp": "...", "png": "..."}},
+     "medium": {...}}
+
+``render_variants`` is pure (bytes in, bytes out) so the backfill command
+can run it in a process pool; ``store_variants`` writes the files through
+the default storage.
+"""
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+
+# name -> maximum width; images are never upscaled
+VARIANT_WIDTHS = {'thumb': 480, 'medium': 1024}
+VARIANT_DIRECTORY = 'articles/derived'
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+WEBP_SUPPORTED = features.check('webp')
+
+
+def _has_alpha(image) -> bool:
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _encode(image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif fmt == 'jpeg':
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def image_size(data) -> tuple:
+    """(width, height) as stored in the file (bytes or an open file), before any EXIF rotation"""
+    with Image.open(data if hasattr(data, 'read') else io.BytesIO(data)) as image:
+        return image.size
+
+
+def render_variants(data) -> dict:
+    """Resize and encode one image (bytes or an open file): ``{name: {'width', 'height', 'files': {format: bytes}}}``"""
+    with Image.open(data if hasattr(data, 'read') else io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        alpha = _has_alpha(source)
+        source = source.convert('RGBA' if alpha else 'RGB')
+        formats = (['webp'] if WEBP_SUPPORTED else []) + ['png' if alpha else 'jpeg']
+        variants = {}
+        for name, max_width in VARIANT_WIDTHS.items():
+            image = source
+            if source.width > max_width:
+                height = max(1, round(source.height * max_width / source.width))
+                image = source.resize((max_width, height), Image.LANCZOS)
+            variants[name] = {
+                'width': image.width,
+                'height': image.height,
+                'files': {fmt: _encode(image, fmt) for fmt in formats},
+            }
+        return variants
+
+
+def store_variants(source_name: str, rendered: dict, previous: dict | None = None) -> dict:
+    """Save rendered variants next to each other and return the ``image_variants`` value"""
+    stem = posixpath.splitext(posixpath.basename(source_name))[0]
+    variants = {'source': source_name}
+    for name, variant in rendered.items():
+        files = {}
+        for fmt, content in variant['files'].items():
+            extension = 'jpg' if fmt == 'jpeg' else fmt
+            path = f'{VARIANT_DIRECTORY}/{stem}-{name}.{extension}'
+            files[fmt] = default_storage.save(path, ContentFile(content))
+        variants[name] = {'width': variant['width'], 'height': variant['height'], 'files': files}
+    delete_variants(previous)
+    return variants
+
+
+def update_article_variants(article) -> bool:
+    """Regenerate ``article``'s variants if its image changed since they were made.
+
+    Writes ``image_variants`` and the original's ``image_width`` and
+    ``image_height`` with a queryset update, so it does not fire the Article
+    signals again. This is the only place the dimensions are read from the
+    file; loading an Article never opens its image. Unreadable images are
+    left without variants and cards fall back to the original.
+    """
+    current = article.image_variants or {}
+    name = article.image.name if article.image else ''
+    if current.get('source', '') == name:
+        return False
+    width = height = None
+    if name:
+        try:
+            with article.image.open('rb') as file:
+                width, height = image_size(file)
+                file.seek(0)
+                rendered = render_variants(file)
+        except (OSError, Image.DecompressionBombError):
+            return False
+        variants = store_variants(name, rendered, previous=current)
+    else:
+        delete_variants(current)
+        variants = {}
+    type(article).objects.filter(pk=article.pk).update(
+        image_variants=variants, image_width=width, image_height=height,
+    )
+    article.image_variants, article.image_width, article.image_height = variants, width, height
+    return True
+
+
+def delete_variants(variants: dict | None) -> None:
+    for name in VARIANT_WIDTHS:
+        for path in ((variants or {}).get(name) or {}).get('files', {}).values():
+            default_storage.delete(path)
+
+
+def srcset(variants: dict, fmt: str) -> str:
+    """``url 480w, url 1024w`` for one format; small sources give a single entry"""
+    entries = {}
+    for name in VARIANT_WIDTHS:
+        variant = variants.get(name)
+        if variant and fmt in variant['files']:
+            entries.setdefault(variant['width'], default_storage.url(variant['files'][fmt]))
+    return ', '.join(f'{url} {width}w' for width, url in entries.items())
+
+
+def picture(variants: dict, name: str) -> dict | None:
+    """What a ``<picture>`` for variant ``name`` needs, or None before variants exist"""
+    variant = variants.get(name) if variants else None
+    if not variant:
+        return None
+    fallback = next(fmt for fmt in variant['files'] if fmt != 'webp')
+    return {
+        'url': default_storage.url(variant['files'][fallback]),
+        'width': variant['width'],
+        'height': variant['height'],
+        'srcset': srcset(variants, fallback),
+        'webp_srcset': srcset(variants, 'webp'),
+    }
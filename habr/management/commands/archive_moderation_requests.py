@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from habr import retention
+
+
+class Command(BaseCommand):
+    help = 'Move approved and rejected moderation requests past retention into compressed archive segments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=retention.RETENTION_DAYS,
+                            help='Keep requests resolved within the last N days')
+        parser.add_argument('--batch-size', type=int, default=retention.BATCH_SIZE,
+                            help='Requests per archive segment')
+
+    def handle(self, *args, **options):
+        archived = retention.archive_resolved(options['days'], options['batch_size'])
+        for kind, count in archived.items():
+            self.stdout.write(f'Archived {count} {kind} requests.')
+        self.stdout.write(self.style.SUCCESS(f'Archived {sum(archived.values())} requests.'))
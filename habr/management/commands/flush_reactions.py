@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from habr import reaction_buffer
+
+
+class Command(BaseCommand):
+    help = 'Apply reactions queued in write-behind mode (HABR_REACTION_WRITES = "buffered")'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=reaction_buffer.FLUSH_BATCH_SIZE,
+                            help='Number of queued events applied per transaction')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and flush every N seconds instead of draining once')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval']
+        if not interval:
+            flushed = self.drain(batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} reaction events.'))
+            return
+        while True:
+            flushed = self.drain(batch_size)
+            if flushed:
+                self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} reaction events.'))
+            time.sleep(interval)
+
+    def drain(self, batch_size: int) -> int:
+        total = 0
+        while flushed := reaction_buffer.flush(batch_size):
+            total += flushed
+        return total
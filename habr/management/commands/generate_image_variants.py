@@ -0,0 +1,72 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from habr import images
+from habr.models import Article
+
+
+def render(data: bytes):
+    """Worker: original size and rendered variants of one image"""
+    return images.image_size(data), images.render_variants(data)
+
+
+class Command(BaseCommand):
+    help = 'Render thumbnail/medium/WebP variants and store dimensions for uploaded article images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes for resizing (default: one per CPU)')
+        parser.add_argument('--batch-size', type=int, default=32,
+                            help='Images read and rendered per round')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render images that already have up-to-date variants')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        rows = Article.objects.exclude(Q(image='') | Q(image__isnull=True)).order_by('pk')
+        rows = rows.values_list('pk', 'image', 'image_variants', 'image_width')
+
+        rendered = skipped = failed = 0
+        last_pk = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                # Rows from before the dimensions were stored are rendered again too
+                todo = [
+                    row for row in batch
+                    if options['force'] or (row[2] or {}).get('source') != row[1] or row[3] is None
+                ]
+                skipped += len(batch) - len(todo)
+
+                jobs = []
+                for pk, name, variants, _ in todo:
+                    try:
+                        with default_storage.open(name, 'rb') as file:
+                            jobs.append((pk, name, variants, pool.submit(render, file.read())))
+                    except OSError as exc:
+                        failed += 1
+                        self.stderr.write(f'Article {pk}: cannot read {name}: {exc}')
+
+                for pk, name, variants, job in jobs:
+                    try:
+                        (width, height), result = job.result()
+                    except Exception as exc:
+                        failed += 1
+                        self.stderr.write(f'Article {pk}: cannot render {name}: {exc}')
+                        continue
+                    Article.objects.filter(pk=pk).update(
+                        image_width=width,
+                        image_height=height,
+                        image_variants=images.store_variants(name, result, previous=variants),
+                    )
+                    rendered += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered variants for {rendered} images ({skipped} up to date, {failed} failed).'
+        ))
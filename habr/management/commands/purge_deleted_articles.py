@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from habr import purge
+
+
+class Command(BaseCommand):
+    help = 'Delete soft-deleted articles and their comments, reactions and requests in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=purge.BATCH_SIZE,
+                            help='Rows removed per DELETE statement')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and purge every N seconds instead of draining once')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval']
+        if not interval:
+            purged = self.drain(batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Purged {purged} articles.'))
+            return
+        while True:
+            purged = self.drain(batch_size)
+            if purged:
+                self.stdout.write(self.style.SUCCESS(f'Purged {purged} articles.'))
+            time.sleep(interval)
+
+    def drain(self, batch_size: int) -> int:
+        total = 0
+        while purged := purge.purge(batch_size=batch_size):
+            total += purged
+        return total
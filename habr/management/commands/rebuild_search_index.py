@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from habr.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all articles in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of articles indexed per transaction')
+
+    def handle(self, *args, **options):
+        indexed = 0
+        for count in rebuild_index(options['batch_size']):
+            indexed += count
+            self.stdout.write(f'Indexed {indexed} articles...')
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt: {indexed} articles.'))
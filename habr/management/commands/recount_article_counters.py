@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from habr import counters, ranking
+from habr.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored like/dislike/rating/comment counters and popularity rankings on articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of article ids updated per statement')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bounds = Article.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write(self.style.WARNING('No articles to recount.'))
+            return
+
+        updated = 0
+        start = bounds['low']
+        while start <= bounds['high']:
+            end = start + batch_size
+            batch = Article.objects.filter(pk__gte=start, pk__lt=end)
+            with transaction.atomic():
+                updated += counters.recompute(batch)
+                ranking.rebuild_rankings(batch)
+            start = end
+
+        self.stdout.write(self.style.SUCCESS(f'Recounted {updated} articles.'))
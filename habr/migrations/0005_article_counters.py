@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:35
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Article = apps.get_model('habr', 'Article')
+    ArticleRating = apps.get_model('habr', 'ArticleRating')
+    Comment = apps.get_model('habr', 'Comment')
+
+    def per_article(model, aggregate):
+        values = model.objects.filter(article_id=OuterRef('pk')).order_by().values('article_id')
+        return Coalesce(
+            Subquery(values.annotate(total=aggregate).values('total'), output_field=IntegerField()),
+            Value(0),
+        )
+
+    Article.objects.update(
+        likes_total=per_article(Article.likes.through, Count('*')),
+        dislikes_total=per_article(Article.dislikes.through, Count('*')),
+        rating_sum=per_article(ArticleRating, Sum('score')),
+        rating_count=per_article(ArticleRating, Count('*')),
+        comment_count=per_article(Comment, Count('*')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habr', '0004_article_image_alter_article_image_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='dislikes_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='likes_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:41
+
+import math
+from datetime import datetime, timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rankings(apps, schema_editor):
+    # Same formula as habr.ranking.hotness at the time of this migration
+    Article = apps.get_model('habr', 'Article')
+    ArticleRanking = apps.get_model('habr', 'ArticleRanking')
+    epoch = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for pk, rating_sum, rating_count, created_at in Article.objects.filter(rating_count__gt=0).values_list(
+        'pk', 'rating_sum', 'rating_count', 'created_at'
+    ).iterator():
+        net = rating_sum - 3 * rating_count
+        sign = (net > 0) - (net < 0)
+        rows.append(ArticleRanking(
+            article_id=pk,
+            mean_rating=round(rating_sum / rating_count, 4),
+            vote_count=rating_count,
+            hotness=round(sign * math.log10(max(abs(net), 1)) + (created_at - epoch).total_seconds() / 45000, 7),
+        ))
+    ArticleRanking.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habr', '0005_article_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleRanking',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='habr.article')),
+                ('mean_rating', models.FloatField(default=0)),
+                ('vote_count', models.PositiveIntegerField(default=0)),
+                ('hotness', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-mean_rating', 'article'], name='habr_ranking_top_idx'), models.Index(fields=['-hotness', 'article'], name='habr_ranking_hot_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_rankings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:55
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def backfill_excerpts(apps, schema_editor):
+    Article = apps.get_model('habr', 'Article')
+    batch = []
+    for article in Article.objects.only('pk', 'summary').iterator(chunk_size=500):
+        # Same rule as habr.models.make_excerpt at the time of this migration
+        article.excerpt = Truncator(Truncator(article.summary).words(30)).chars(500)
+        batch.append(article)
+        if len(batch) == 500:
+            Article.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    Article.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habr', '0009_article_view_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
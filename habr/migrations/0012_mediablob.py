@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:59
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    """Reference rows for files already used by articles: the image and its variants"""
+    Article = apps.get_model('habr', 'Article')
+    MediaBlob = apps.get_model('habr', 'MediaBlob')
+    references = Counter()
+    for image, variants in Article.objects.exclude(image='').exclude(image__isnull=True).values_list(
+        'image', 'image_variants'
+    ).iterator():
+        references[image] += 1
+        for key, variant in (variants or {}).items():
+            if key != 'source':
+                references.update(variant.get('files', {}).values())
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name, refcount=count) for name, count in references.items()], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habr', '0011_article_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,190 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:07
+
+import hashlib
+import json
+import re
+from difflib import SequenceMatcher
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Same format as habr.deltas / habr.revisions at the time of this migration
+_TOKEN_RE = re.compile(r'\s+|\w+|[^\w\s]', re.UNICODE)
+FIELDS = ('title', 'summary', 'content', 'category_id', 'image_url')
+
+
+def _common_prefix(a, b):
+    limit = min(len(a), len(b))
+    size = 0
+    while size < limit and a[size] == b[size]:
+        size += 1
+    return size
+
+
+def make_delta(old, new):
+    prefix = _common_prefix(old, new)
+    suffix = _common_prefix(old[prefix:][::-1], new[prefix:][::-1])
+    a = _TOKEN_RE.findall(old[prefix:len(old) - suffix])
+    b = _TOKEN_RE.findall(new[prefix:len(new) - suffix])
+    ops = [prefix] if prefix else []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            ops.append(sum(map(len, a[i1:i2])))
+            continue
+        if i2 > i1:
+            ops.append('-' + ''.join(a[i1:i2]))
+        if j2 > j1:
+            ops.append('+' + ''.join(b[j1:j2]))
+    if suffix:
+        ops.append(suffix)
+    merged = []
+    for op in ops:
+        if isinstance(op, int) and merged and isinstance(merged[-1], int):
+            merged[-1] += op
+        else:
+            merged.append(op)
+    return merged
+
+
+def apply_delta(old, ops):
+    parts, position = [], 0
+    for op in ops:
+        if isinstance(op, int):
+            parts.append(old[position:position + op])
+            position += op
+        elif op.startswith('-'):
+            position += len(op) - 1
+        else:
+            parts.append(op[1:])
+    return ''.join(parts)
+
+
+def backfill_revisions(apps, schema_editor):
+    """Revision 1 (a snapshot) of every article; pending and past edit requests become deltas against it"""
+    Article = apps.get_model('habr', 'Article')
+    ArticleRevision = apps.get_model('habr', 'ArticleRevision')
+    ArticleEditRequest = apps.get_model('habr', 'ArticleEditRequest')
+
+    articles = Article.objects.order_by('pk').values('pk', 'author_id', *FIELDS)
+    batch = []
+    for row in articles.iterator(chunk_size=500):
+        fields = {field: row[field] for field in FIELDS}
+        payload = json.dumps([fields[field] for field in FIELDS], ensure_ascii=False)
+        batch.append(ArticleRevision(
+            article_id=row['pk'], number=1, snapshot_number=1, author_id=row['author_id'], data=fields,
+            checksum=hashlib.sha1(payload.encode(), usedforsecurity=False).hexdigest(),
+        ))
+        if len(batch) == 500:
+            ArticleRevision.objects.bulk_create(batch)
+            batch = []
+    ArticleRevision.objects.bulk_create(batch)
+
+    requests = list(ArticleEditRequest.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(requests), 500):
+        rows = ArticleEditRequest.objects.filter(pk__in=requests[start:start + 500]).values(
+            'pk', 'article_id', 'summary', 'content'
+        )
+        rows = list(rows)
+        bases = {
+            revision['article_id']: revision
+            for revision in ArticleRevision.objects.filter(article_id__in={row['article_id'] for row in rows})
+            .values('article_id', 'pk', 'data')
+        }
+        batch = []
+        for row in rows:
+            base = bases[row['article_id']]
+            changes = {
+                field: make_delta(base['data'][field], row[field])
+                for field in ('summary', 'content') if base['data'][field] != row[field]
+            }
+            batch.append(ArticleEditRequest(pk=row['pk'], base_revision_id=base['pk'], changes=changes))
+        ArticleEditRequest.objects.bulk_update(batch, ['base_revision', 'changes'])
+
+
+def restore_request_texts(apps, schema_editor):
+    """Put full summary/content back on edit requests, rebuilt from their deltas"""
+    ArticleEditRequest = apps.get_model('habr', 'ArticleEditRequest')
+    ArticleRevision = apps.get_model('habr', 'ArticleRevision')
+    batch = []
+    for request in ArticleEditRequest.objects.exclude(base_revision=None).iterator(chunk_size=500):
+        base = ArticleRevision.objects.get(pk=request.base_revision_id)
+        chain = ArticleRevision.objects.filter(
+            article_id=base.article_id, number__gte=base.snapshot_number, number__lte=base.number,
+        ).order_by('number')
+        fields = {}
+        for revision in chain:
+            if revision.number == revision.snapshot_number:
+                fields = dict(revision.data)
+            else:
+                for field, change in revision.data.items():
+                    fields[field] = apply_delta(fields[field], change) if field in ('title', 'summary', 'content') else change
+        request.summary = apply_delta(fields['summary'], request.changes['summary']) if 'summary' in request.changes else fields['summary']
+        request.content = apply_delta(fields['content'], request.changes['content']) if 'content' in request.changes else fields['content']
+        batch.append(request)
+        if len(batch) == 500:
+            ArticleEditRequest.objects.bulk_update(batch, ['summary', 'content'])
+            batch = []
+    ArticleEditRequest.objects.bulk_update(batch, ['summary', 'content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habr', '0012_mediablob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='articleeditrequest',
+            name='changes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name='ArticleRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('snapshot_number', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('data', models.JSONField(default=dict)),
+                ('checksum', models.CharField(max_length=40)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='habr.article')),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='article_revisions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='articleeditrequest',
+            name='base_revision',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='edit_requests', to='habr.articlerevision'),
+        ),
+        migrations.AddConstraint(
+            model_name='articlerevision',
+            constraint=models.UniqueConstraint(fields=('article', 'number'), name='habr_revision_number_uniq'),
+        ),
+        # A default lets the columns be added back when migrating backwards
+        migrations.AlterField(
+            model_name='articleeditrequest',
+            name='summary',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='articleeditrequest',
+            name='content',
+            field=models.TextField(default=''),
+        ),
+        migrations.RunPython(backfill_revisions, restore_request_texts),
+        migrations.RemoveField(
+            model_name='articleeditrequest',
+            name='content',
+        ),
+        migrations.RemoveField(
+            model_name='articleeditrequest',
+            name='summary',
+        ),
+    ]
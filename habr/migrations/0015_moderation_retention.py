@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_rejections(apps, schema_editor):
+    """The latest rejected request per article, user and kind becomes its summary row"""
+    ModerationRejection = apps.get_model('habr', 'ModerationRejection')
+    latest = {}
+    for kind, model_name in (('edit', 'ArticleEditRequest'), ('delete', 'ArticleDeleteRequest')):
+        model = apps.get_model('habr', model_name)
+        rows = model.objects.filter(status='REJECTED').order_by('created_at', 'pk').values_list(
+            'article_id', 'user_id', 'rejection_reason', 'reviewed_at', 'created_at', 'reviewed_by_id',
+        )
+        for article_id, user_id, reason, reviewed_at, created_at, reviewed_by_id in rows.iterator():
+            latest[article_id, user_id, kind] = (reason, reviewed_at or created_at, reviewed_by_id)
+    ModerationRejection.objects.bulk_create(
+        (
+            ModerationRejection(
+                article_id=article_id, user_id=user_id, kind=kind,
+                reason=reason or '', rejected_at=rejected_at, reviewed_by_id=reviewed_by_id,
+            )
+            for (article_id, user_id, kind), (reason, rejected_at, reviewed_by_id) in latest.items()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habr', '0014_article_is_deleted'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModerationArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('edit', 'Edit request'), ('delete', 'Delete request')], max_length=10)),
+                ('count', models.PositiveIntegerField()),
+                ('first_resolved_at', models.DateTimeField()),
+                ('last_resolved_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'ordering': ['-last_resolved_at'],
+                'indexes': [models.Index(fields=['kind', '-last_resolved_at'], name='habr_modarchive_kind_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ModerationRejection',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('edit', 'Edit request'), ('delete', 'Delete request')], max_length=10)),
+                ('reason', models.TextField(blank=True)),
+                ('rejected_at', models.DateTimeField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rejections', to='habr.article')),
+                ('reviewed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='moderation_rejections', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('article', 'user', 'kind'), name='habr_rejection_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_rejections, migrations.RunPython.noop),
+    ]
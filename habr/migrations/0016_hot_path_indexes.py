@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habr', '0015_moderation_retention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['is_approved', 'is_published', '-created_at', '-id'], name='habr_article_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['category', 'is_approved', 'is_published', '-created_at', '-id'], name='habr_article_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='habr_article_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articledeleterequest',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='habr_deletereq_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articledeleterequest',
+            index=models.Index(fields=['article', 'user', 'status', 'created_at'], name='habr_deletereq_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articleeditrequest',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='habr_editreq_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='articleeditrequest',
+            index=models.Index(fields=['article', 'user', 'status', 'created_at'], name='habr_editreq_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', '-created_at', '-id'], name='habr_comment_article_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habr', '0017_article_image_without_dimension_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchposting',
+            index=models.Index(fields=['term', '-frequency'], name='habr_posting_term_freq_idx'),
+        ),
+    ]
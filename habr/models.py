@@ -1,7 +1,18 @@
 from django.conf import settings
-from django.db import models
-from django.db.models import Avg
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils.text import Truncator
+
+from . import deltas, images
+
+
+EXCERPT_WORDS = 30
+EXCERPT_MAX_LENGTH = 500
+
+
+def make_excerpt(summary: str) -> str:
+    """The card text for a summary: its first EXCERPT_WORDS words, capped to fit the column"""
+    return Truncator(Truncator(summary).words(EXCERPT_WORDS)).chars(EXCERPT_MAX_LENGTH)
 
 
 class UserProfile(models.Model):
@@ -42,16 +53,35 @@ class Article(models.Model):
     title = models.CharField(max_length=200)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name="articles")
     image = models.ImageField(upload_to='articles/', blank=True, null=True)
+    # Set by habr.images with the variants, not through width_field/height_field:
+    # those make Django open the image file whenever an Article is loaded
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # Resized WebP/JPEG renditions with their sizes, maintained by habr.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     image_url = models.URLField(blank=True, help_text="Alternative: use Cloudinary URL if not uploading file")
     summary = models.TextField(help_text="Short excerpt shown on the main page")
+    # Pre-truncated summary for list cards, so lists can leave summary and content out of the SELECT
+    excerpt = models.CharField(max_length=EXCERPT_MAX_LENGTH, blank=True, editable=False)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_approved = models.BooleanField(default=False)
     is_published = models.BooleanField(default=False)
+    # Hidden and waiting for habr.purge to delete it with its dependents
+    is_deleted = models.BooleanField(default=False)
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="liked_articles", blank=True)
     dislikes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name="disliked_articles", blank=True)
-    
+
+    # Denormalized counters, kept in sync by the action views (see habr.counters)
+    likes_total = models.PositiveIntegerField(default=0)
+    dislikes_total = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # Flushed in batches from the per-process buffer in habr.view_counter
+    view_count = models.PositiveIntegerField(default=0)
+
     @property
     def image_display_url(self):
         """Return image URL - prefer uploaded image over URL field"""
@@ -59,25 +89,55 @@ class Article(models.Model):
             return self.image.url
         return self.image_url if self.image_url else None
 
+    @property
+    def image_thumb(self):
+        return images.picture(self.image_variants, 'thumb')
+
+    @property
+    def image_medium(self):
+        return images.picture(self.image_variants, 'medium')
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=['-view_count', '-id'], name='habr_article_views_idx'),
+            models.Index(fields=['id'], condition=models.Q(is_deleted=True), name='habr_article_deleted_idx'),
+            # Keyset pages of the feeds: equality columns first, then the page order.
+            # Not filtered indexes, because the flags arrive as bound parameters and
+            # SQL Server only matches a filter predicate against literals.
+            models.Index(fields=['is_approved', 'is_published', '-created_at', '-id'], name='habr_article_feed_idx'),
+            models.Index(fields=['category', 'is_approved', 'is_published', '-created_at', '-id'], name='habr_article_category_idx'),
+            # Also serves the profile page, which lists unpublished articles too
+            models.Index(fields=['author', '-created_at', '-id'], name='habr_article_author_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
+    def save(self, *args, **kwargs):
+        if 'summary' not in self.get_deferred_fields():
+            self.excerpt = make_excerpt(self.summary)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'summary' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        # The image's storage reference is taken while the row is written, so a failed save drops it too
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     @property
     def likes_count(self) -> int:
-        return self.likes.count()
+        return self.likes_total
 
     @property
     def dislikes_count(self) -> int:
-        return self.dislikes.count()
+        return self.dislikes_total
 
     @property
     def rating(self) -> float:
-        """Calculate article rating as arithmetic average"""
-        avg_rating = self.ratings.aggregate(Avg('score'))['score__avg']
-        return round(avg_rating, 2) if avg_rating else 0.0
+        """Article rating as arithmetic average of the stored score sum"""
+        if not self.rating_count:
+            return 0.0
+        return round(self.rating_sum / self.rating_count, 2)
 
     @property
     def is_popular(self) -> bool:
@@ -96,6 +156,76 @@ class ArticleRating(models.Model):
         ordering = ['-created_at']
 
 
+class ReactionEvent(models.Model):
+    """A reaction waiting to be applied in write-behind mode (see habr.reaction_buffer)"""
+    KIND_CHOICES = [
+        ('like', 'Like'),
+        ('dislike', 'Dislike'),
+        ('bookmark', 'Bookmark'),
+        ('rating', 'Rating'),
+    ]
+
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='reaction_events')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reaction_events')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # 1/0 for like, dislike and bookmark; the score for a rating
+    value = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'article', 'kind'], name='habr_reaction_event_user_idx'),
+        ]
+
+
+class MediaBlob(models.Model):
+    """How many references a stored media file has (see habr.storage)"""
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+
+class ArticleRanking(models.Model):
+    """Precomputed popularity of a rated article, maintained by habr.ranking"""
+    article = models.OneToOneField(Article, on_delete=models.CASCADE, primary_key=True, related_name='ranking')
+    mean_rating = models.FloatField(default=0)
+    vote_count = models.PositiveIntegerField(default=0)
+    hotness = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-mean_rating', 'article'], name='habr_ranking_top_idx'),
+            models.Index(fields=['-hotness', 'article'], name='habr_ranking_hot_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.article_id}: {self.mean_rating} ({self.vote_count} votes)"
+
+
+class SearchDocument(models.Model):
+    """An article in the search index; ``length`` is its weighted token count for BM25"""
+    article = models.OneToOneField(Article, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    length = models.PositiveIntegerField(default=0)
+    indexed_at = models.DateTimeField(auto_now=True)
+
+
+class SearchPosting(models.Model):
+    """One term of one indexed article with its weighted frequency (see habr.search)"""
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ['term', 'document']
+        indexes = [
+            # The most frequent postings of a common term (habr.search.MAX_POSTINGS_PER_TERM)
+            models.Index(fields=['term', '-frequency'], name='habr_posting_term_freq_idx'),
+        ]
+
+
 class Bookmark(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='bookmarks')
     article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='bookmarked_by')
@@ -118,11 +248,43 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['article', '-created_at', '-id'], name='habr_comment_article_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} commented on {self.article.title}"
 
 
+class ArticleRevision(models.Model):
+    """One saved version of an article's text (see habr.revisions).
+
+    Every few revisions ``data`` is a full snapshot of the fields; in between
+    it holds only the changes from the previous revision, as deltas for the
+    text fields. ``snapshot_number`` is where this revision's chain starts.
+    """
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='revisions')
+    number = models.PositiveIntegerField()
+    snapshot_number = models.PositiveIntegerField()
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='article_revisions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(default=dict)
+    checksum = models.CharField(max_length=40)
+
+    class Meta:
+        ordering = ['-number']
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'number'], name='habr_revision_number_uniq'),
+        ]
+
+    @property
+    def is_snapshot(self) -> bool:
+        return self.number == self.snapshot_number
+
+    def __str__(self):
+        return f"Revision {self.number} of article {self.article_id}"
+
+
 class ArticleEditRequest(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -137,8 +299,9 @@ class ArticleEditRequest(models.Model):
     title = models.CharField(max_length=200)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='edit_requests')
     image_url = models.URLField(blank=True)
-    summary = models.TextField()
-    content = models.TextField()
+    # Summary and content as deltas against the revision the author edited
+    base_revision = models.ForeignKey(ArticleRevision, on_delete=models.SET_NULL, null=True, blank=True, related_name='edit_requests')
+    changes = models.JSONField(default=dict, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     reviewed_at = models.DateTimeField(null=True, blank=True)
@@ -147,10 +310,21 @@ class ArticleEditRequest(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The moderation queue, and the resolved rows habr.retention archives
+            models.Index(fields=['status', '-created_at', '-id'], name='habr_editreq_status_idx'),
+            # The viewer's own pending request on the article page
+            models.Index(fields=['article', 'user', 'status', 'created_at'], name='habr_editreq_owner_idx'),
+        ]
 
     def __str__(self):
         return f"Edit request for {self.article.title} by {self.user.username}"
 
+    @property
+    def diff(self) -> dict:
+        """The proposed summary/content changes as ``deltas.fragments``, straight from the stored deltas"""
+        return {field: deltas.fragments(ops) for field, ops in self.changes.items()}
+
 
 class ArticleDeleteRequest(models.Model):
     STATUS_CHOICES = [
@@ -168,10 +342,54 @@ class ArticleDeleteRequest(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The moderation queue, and the resolved rows habr.retention archives
+            models.Index(fields=['status', '-created_at', '-id'], name='habr_deletereq_status_idx'),
+            # The viewer's own pending request on the article page
+            models.Index(fields=['article', 'user', 'status', 'created_at'], name='habr_deletereq_owner_idx'),
+        ]
 
     def __str__(self):
         return f"Delete request for {self.article.title} by {self.user.username}"
 
 
+class ModerationRejection(models.Model):
+    """The latest rejection of one user's edit or delete requests for one article.
+
+    Kept when the requests themselves are archived (see habr.retention), and
+    read by the detail page instead of scanning the request tables.
+    """
+    KIND_CHOICES = [
+        ('edit', 'Edit request'),
+        ('delete', 'Delete request'),
+    ]
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='rejections')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='moderation_rejections')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    reason = models.TextField(blank=True)
+    rejected_at = models.DateTimeField()
+    reviewed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'user', 'kind'], name='habr_rejection_uniq'),
+        ]
+
 
+class ModerationArchive(models.Model):
+    """A batch of resolved moderation requests moved out of the request tables (see habr.retention).
 
+    ``data`` is zlib-compressed JSON Lines, one request per line with its column values.
+    """
+    kind = models.CharField(max_length=10, choices=ModerationRejection.KIND_CHOICES)
+    count = models.PositiveIntegerField()
+    first_resolved_at = models.DateTimeField()
+    last_resolved_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    data = models.BinaryField()
+
+    class Meta:
+        ordering = ['-last_resolved_at']
+        indexes = [
+            models.Index(fields=['kind', '-last_resolved_at'], name='habr_modarchive_kind_idx'),
+        ]
@@ -0,0 +1,170 @@
+"""Moderation queue: pending edit and delete requests, one at a time or in bulk.
+
+Approving edit requests rebuilds each proposal from its base revision and
+writes a chunk of articles with one ``UPDATE`` instead of a load and save
+per row. When several selected requests target the same article the newest
+wins, as if they had been approved one by one in order. Approving delete
+requests soft-deletes their articles (see ``habr.purge``). Each bulk call is
+one transaction.
+
+Rejections also update the per-article, per-user ``ModerationRejection``
+summary, which outlives the archived requests (see ``habr.retention``).
+
+Queryset updates do not send ``post_save``, so the side effects the Article
+signals would have had (search index, category counts) are applied here.
+"""
+import operator
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+
+from . import purge, revisions, search, suggest
+from .models import Article, ArticleDeleteRequest, ArticleEditRequest, ModerationRejection, make_excerpt
+from .navigation import invalidate_categories
+from .page_cache import bump_content_generation
+
+
+QUEUE_PAGE_SIZE = 20
+# Keeps IN lists well under SQL Server's 2100 parameter limit
+CHUNK_SIZE = 500
+# The edit UPDATE has two parameters per article for each of its six CASEs
+EDIT_CHUNK_SIZE = 100
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def edit_queue():
+    """Pending edit requests with everything the queue shows joined in"""
+    return ArticleEditRequest.objects.filter(status='PENDING', article__is_deleted=False).select_related('article', 'user', 'category').only(
+        'pk', 'created_at', 'title', 'changes', 'article__title', 'user__username', 'category__name',
+    )
+
+
+def delete_queue():
+    """Pending delete requests with their article and requester joined in"""
+    return ArticleDeleteRequest.objects.filter(status='PENDING', article__is_deleted=False).select_related('article', 'user').only(
+        'pk', 'created_at', 'article__title', 'user__username',
+    )
+
+
+def _pending_rows(model, pks, *fields) -> list:
+    rows = []
+    for chunk in _chunks(list(pks)):
+        rows.extend(
+            model.objects.filter(status='PENDING', pk__in=chunk, article__is_deleted=False).values_list('pk', *fields)
+        )
+    return rows
+
+
+def _mark(model, pks, reviewer, status: str, **extra) -> int:
+    now = timezone.now()
+    return sum(
+        model.objects.filter(status='PENDING', pk__in=chunk).update(
+            status=status, reviewed_at=now, reviewed_by=reviewer, **extra
+        )
+        for chunk in _chunks(list(pks))
+    )
+
+
+def approve_edit_requests(pks, reviewer) -> int:
+    """Apply pending edit requests to their articles; returns how many were approved.
+
+    Edited articles go back to the approval queue, as with a single approval,
+    and each gets a new revision credited to the request's author.
+    """
+    with transaction.atomic():
+        rows = _pending_rows(ArticleEditRequest, pks, 'created_at', 'article_id')
+        newest = {}
+        for pk, created_at, article_id in sorted(rows, key=lambda row: (row[1], row[0])):
+            newest[article_id] = pk
+        now = timezone.now()
+        article_ids = []
+        for chunk in _chunks(list(newest.values()), EDIT_CHUNK_SIZE):
+            requests = list(
+                ArticleEditRequest.objects.filter(pk__in=chunk).select_related('base_revision').defer('base_revision__data')
+            )
+            proposed = revisions.proposed_fields(requests)
+            edits = {request.article_id: (request.user_id, proposed[request.pk]) for request in requests if request.pk in proposed}
+            if not edits:
+                continue
+            Article.objects.filter(pk__in=list(edits)).update(
+                **{field: _per_article(edits, lambda fields: fields[field]) for field in revisions.FIELDS},
+                excerpt=_per_article(edits, lambda fields: make_excerpt(fields['summary'])),
+                is_approved=False,
+                is_published=False,
+                updated_at=now,
+            )
+            revisions.record_many((article_id, fields, user_id) for article_id, (user_id, fields) in edits.items())
+            article_ids.extend(edits)
+        search.remove_articles(article_ids)
+        applied = set(article_ids)
+        approved = _mark(ArticleEditRequest, [row[0] for row in rows if row[2] in applied], reviewer, 'APPROVED')
+    _articles_changed(article_ids)
+    return approved
+
+
+def _per_article(edits: dict, value) -> Case:
+    """CASE giving each article in ``edits`` its own ``value(fields)``"""
+    return Case(*(When(pk=article_id, then=Value(value(fields))) for article_id, (_, fields) in edits.items()))
+
+
+def approve_delete_requests(pks, reviewer) -> int:
+    """Hide the articles of pending delete requests; returns how many requests were approved.
+
+    The articles and everything attached to them, these requests included,
+    are deleted later by ``habr.purge``.
+    """
+    with transaction.atomic():
+        rows = _pending_rows(ArticleDeleteRequest, pks, 'article_id')
+        approved = _mark(ArticleDeleteRequest, [pk for pk, _ in rows], reviewer, 'APPROVED')
+        purge.soft_delete({article_id for _, article_id in rows})
+    return approved
+
+
+def reject_edit_requests(pks, reviewer, reason: str = '') -> int:
+    return _reject(ArticleEditRequest, 'edit', pks, reviewer, reason)
+
+
+def reject_delete_requests(pks, reviewer, reason: str = '') -> int:
+    return _reject(ArticleDeleteRequest, 'delete', pks, reviewer, reason)
+
+
+def _reject(model, kind: str, pks, reviewer, reason: str) -> int:
+    with transaction.atomic():
+        rows = _pending_rows(model, pks, 'article_id', 'user_id')
+        rejected = _mark(model, [pk for pk, _, _ in rows], reviewer, 'REJECTED', rejection_reason=reason)
+        record_rejections(kind, {(article_id, user_id) for _, article_id, user_id in rows}, reviewer, reason)
+    return rejected
+
+
+def record_rejections(kind: str, pairs, reviewer, reason: str) -> None:
+    """Make this the latest rejection summary for each (article id, user id) in ``pairs``"""
+    pairs = list(pairs)
+    now = timezone.now()
+    # Three parameters per pair
+    for chunk in _chunks(pairs, CHUNK_SIZE // 3):
+        ModerationRejection.objects.filter(
+            reduce(operator.or_, (Q(article_id=article_id, user_id=user_id) for article_id, user_id in chunk)),
+            kind=kind,
+        ).delete()
+        ModerationRejection.objects.bulk_create(
+            ModerationRejection(
+                article_id=article_id, user_id=user_id, kind=kind, reason=reason, rejected_at=now, reviewed_by=reviewer,
+            )
+            for article_id, user_id in chunk
+        )
+
+
+def _articles_changed(article_ids: list) -> None:
+    if not article_ids:
+        return
+    invalidate_categories()
+    bump_content_generation()
+    for article_id in article_ids:
+        # Edited articles await re-approval, so either way they leave the index
+        suggest.article_removed(article_id)
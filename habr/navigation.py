@@ -0,0 +1,65 @@
+import threading
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Category
+
+
+GENERATION_KEY = 'habr:categories:generation'
+
+_lock = threading.Lock()
+_state = {'generation': None, 'categories': (), 'by_slug': {}}
+
+
+def _current_generation() -> int:
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 0, timeout=None)
+        generation = cache.get(GENERATION_KEY, 0)
+    return generation
+
+
+def get_categories():
+    """Categories with approved article counts, rebuilt only after an invalidation.
+
+    The list lives in process memory; the cache only holds a generation
+    number, so with a shared cache (see CACHES in settings) an invalidation
+    in one worker is picked up by all of them on their next request without
+    any of them querying the database.
+    """
+    generation = _current_generation()
+    if _state['generation'] != generation:
+        with _lock:
+            if _state['generation'] != generation:
+                categories = tuple(Category.objects.annotate(
+                    article_count=Count('articles', filter=Q(articles__is_approved=True, articles__is_published=True))
+                ))
+                _state['by_slug'] = {category.slug: category for category in categories}
+                _state['categories'] = categories
+                _state['generation'] = generation
+    return _state['categories']
+
+
+def get_category(slug: str):
+    """Cached category by slug, or None"""
+    get_categories()
+    return _state['by_slug'].get(slug)
+
+
+def _bump_generation() -> None:
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+    _state['generation'] = None
+
+
+def invalidate_categories() -> None:
+    """Rebuild the categories everywhere once the current transaction commits.
+
+    Bumping before the commit would let a concurrent request cache the old
+    counts under the new generation; a rolled-back change bumps nothing.
+    """
+    transaction.on_commit(_bump_generation)
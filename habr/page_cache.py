@@ -0,0 +1,119 @@
+"""Full-page cache for anonymous GETs.
+
+Entries are keyed on the absolute URL and remember the content generation
+they were rendered under. Moderation actions that change what is visible
+call ``bump_content_generation()``, which makes every cached page stale at
+once without having to know which URLs showed the article.
+
+A stale page (expired, or from an older generation) is rebuilt by exactly
+one request, chosen with an atomic ``cache.add`` lock; everyone else keeps
+getting the stale copy until the new one is stored. A cold miss waits
+briefly for whoever holds the lock instead of rendering the page again.
+
+The generation and the locks only coordinate the worker processes when they
+share a cache (see CACHES in settings).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+
+GENERATION_KEY = 'habr:content:generation'
+
+FRESH_SECONDS = getattr(settings, 'HABR_PAGE_CACHE_SECONDS', 60)
+STALE_SECONDS = getattr(settings, 'HABR_PAGE_CACHE_STALE_SECONDS', 300)
+LOCK_SECONDS = 30
+COLD_MISS_WAIT_SECONDS = 2.0
+COLD_MISS_POLL_SECONDS = 0.05
+
+
+def content_generation() -> int:
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 0, timeout=None)
+        generation = cache.get(GENERATION_KEY, 0)
+    return generation
+
+
+def _bump() -> None:
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+def bump_content_generation() -> None:
+    """Mark every cached anonymous page as stale once the current transaction commits"""
+    transaction.on_commit(_bump)
+
+
+def _is_cacheable_request(request) -> bool:
+    return request.method in ('GET', 'HEAD') and not request.user.is_authenticated
+
+
+def _is_cacheable_response(response) -> bool:
+    return response.status_code == 200 and not response.cookies and not response.streaming
+
+
+def _is_fresh(entry, generation: int) -> bool:
+    return entry['generation'] == generation and entry['fresh_until'] > time.time()
+
+
+def _to_response(entry, status: str) -> HttpResponse:
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['X-Page-Cache'] = status
+    return response
+
+
+def anonymous_page_cache(view):
+    """Cache ``view`` for anonymous visitors with single-flight stale-while-revalidate"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable_request(request):
+            return view(request, *args, **kwargs)
+
+        url = request.build_absolute_uri()
+        digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+        key = f'habr:page:{digest}'
+        lock_key = f'{key}:lock'
+        generation = content_generation()
+
+        entry = cache.get(key)
+        if entry is not None and _is_fresh(entry, generation):
+            return _to_response(entry, 'hit')
+
+        if not cache.add(lock_key, 1, timeout=LOCK_SECONDS):
+            # Someone else is rendering this page
+            if entry is not None:
+                return _to_response(entry, 'stale')
+            deadline = time.monotonic() + COLD_MISS_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(COLD_MISS_POLL_SECONDS)
+                entry = cache.get(key)
+                if entry is not None and entry['generation'] == generation:
+                    return _to_response(entry, 'hit')
+            return view(request, *args, **kwargs)
+
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            if _is_cacheable_response(response):
+                cache.set(key, {
+                    'generation': generation,
+                    'fresh_until': time.time() + FRESH_SECONDS,
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                }, timeout=FRESH_SECONDS + STALE_SECONDS)
+                response['X-Page-Cache'] = 'miss'
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
@@ -0,0 +1,147 @@
+import datetime
+
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+CURSOR_SALT = 'habr.pagination.cursor'
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset with opaque next/previous tokens"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Seek-method paginator: no OFFSET and no COUNT(*), cost is the same on every page.
+
+    ``ordering`` must end with a unique column (normally ``-id``) so that the
+    key of the last row on a page identifies the boundary unambiguously.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+
+    def page(self, cursor=None) -> KeysetPage:
+        direction, key = self.decode(cursor)
+        ordering = self.ordering if direction == 'next' else tuple(_flip(f) for f in self.ordering)
+
+        queryset = self.queryset.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(_seek(ordering, key))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == 'next':
+            has_next, has_previous = has_more, key is not None
+        else:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+
+        if not rows:
+            return KeysetPage(rows)
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode('next', rows[-1]) if has_next else None,
+            previous_cursor=self.encode('previous', rows[0]) if has_previous else None,
+        )
+
+    def encode(self, direction: str, row) -> str:
+        key = [getattr(row, _name(field)) for field in self.ordering]
+        return signing.dumps({'d': direction, 'k': key}, salt=CURSOR_SALT, serializer=_CursorSerializer)
+
+    def decode(self, cursor):
+        """Return (direction, key values); an invalid or missing token means the first page"""
+        if not cursor:
+            return 'next', None
+        try:
+            payload = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            return 'next', None
+        direction, key = payload.get('d'), payload.get('k')
+        if direction not in ('next', 'previous') or not isinstance(key, list) or len(key) != len(self.ordering):
+            return 'next', None
+        return direction, [self._to_python(field, value) for field, value in zip(self.ordering, key)]
+
+    def _to_python(self, field, value):
+        try:
+            model_field = self.queryset.model._meta.get_field(_name(field))
+        except FieldDoesNotExist:
+            return value  # annotation, JSON already gives the right type
+        return model_field.to_python(value)
+
+
+class KeysetPaginationMixin:
+    """Drop-in replacement for ListView pagination using KeysetPaginator"""
+
+    paginate_by = 20
+    keyset_ordering = ('-created_at', '-id')
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.get_keyset_ordering())
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """Keep microseconds: DjangoJSONEncoder truncates datetimes to milliseconds"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class _CursorSerializer:
+    def dumps(self, obj):
+        return _CursorEncoder(separators=(',', ':')).encode(obj).encode('latin-1')
+
+    def loads(self, data):
+        return signing.JSONSerializer().loads(data)
+
+
+def _name(field: str) -> str:
+    return field.lstrip('-')
+
+
+def _flip(field: str) -> str:
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def _seek(ordering, key) -> Q:
+    """Rows strictly after ``key`` in ``ordering``: (a, b, c) > (x, y, z) expanded for any mix of directions"""
+    condition = Q()
+    for position, field in enumerate(ordering):
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{_name(f): key[i] for i, f in enumerate(ordering[:position])})
+        step &= Q(**{f'{_name(field)}__{lookup}': key[position]})
+        condition |= step
+    return condition
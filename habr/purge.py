@@ -0,0 +1,102 @@
+"""Two-step article deletion.
+
+``soft_delete`` only hides articles: they are flagged ``is_deleted`` and
+unpublished, so every listing, the search index and the suggestions drop
+them at once, in a request that touches nothing but the article rows.
+
+``purge`` (run by the ``purge_deleted_articles`` command) then removes what
+depends on them in batches of plain ``DELETE ... WHERE id IN (...)``
+statements, each its own short transaction, and finally the article rows.
+Django's collector would instead load every comment, rating, bookmark and
+reaction into memory and delete them all in one long transaction.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from . import search, suggest
+from .models import (
+    Article, ArticleDeleteRequest, ArticleEditRequest, ArticleRanking, ArticleRating, ArticleRevision, Bookmark,
+    Comment, ModerationRejection, ReactionEvent, SearchDocument, SearchPosting,
+)
+from .navigation import invalidate_categories
+from .page_cache import bump_content_generation
+
+
+BATCH_SIZE = getattr(settings, 'HABR_PURGE_BATCH_SIZE', 500)
+# Keeps IN lists well under SQL Server's 2100 parameter limit
+CHUNK_SIZE = 500
+
+# Rows that go with an article, children before the rows they point to.
+# SearchPosting.document is the article's SearchDocument, whose pk is the article id.
+DEPENDENTS = (
+    (SearchPosting, 'document'),
+    (SearchDocument, 'article'),
+    (Article.likes.through, 'article'),
+    (Article.dislikes.through, 'article'),
+    (ArticleRating, 'article'),
+    (Bookmark, 'article'),
+    (Comment, 'article'),
+    (ReactionEvent, 'article'),
+    (ArticleEditRequest, 'article'),
+    (ArticleRevision, 'article'),
+    (ArticleDeleteRequest, 'article'),
+    (ModerationRejection, 'article'),
+    (ArticleRanking, 'article'),
+)
+
+
+def soft_delete(article_pks) -> int:
+    """Hide articles now and leave the actual deletion to ``purge``; returns how many were hidden"""
+    article_pks = list(article_pks)
+    hidden = 0
+    with transaction.atomic():
+        for start in range(0, len(article_pks), CHUNK_SIZE):
+            hidden += Article.objects.filter(pk__in=article_pks[start:start + CHUNK_SIZE], is_deleted=False).update(
+                is_deleted=True, is_approved=False, is_published=False,
+            )
+        search.remove_articles(article_pks)
+    if article_pks:
+        invalidate_categories()
+        bump_content_generation()
+        for article_pk in article_pks:
+            suggest.article_removed(article_pk)
+    return hidden
+
+
+def _delete_in_batches(queryset, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        batch = queryset.model.objects.filter(pk__in=pks)
+        # No collector: no per-row signals, nothing loaded beyond the ids
+        deleted += batch._raw_delete(batch.db)
+
+
+def purge_article(article_pk: int, batch_size: int = BATCH_SIZE) -> int:
+    """Delete a soft-deleted article and everything that depends on it; returns the rows removed.
+
+    Safe to run for the same article in several processes at once: the
+    dependent deletes are idempotent, and the article row is locked before
+    its final delete, so its post_delete signals are sent only once.
+    """
+    removed = 0
+    for model, field in DEPENDENTS:
+        removed += _delete_in_batches(model.objects.filter(**{field: article_pk}), batch_size)
+    with transaction.atomic():
+        article = Article.objects.select_for_update().filter(pk=article_pk, is_deleted=True).first()
+        if article is None:
+            return removed
+        # Nothing is left to cascade to, so the collector only sends the
+        # article's post_delete signals (media references, category counts)
+        article.delete()
+    return removed + 1
+
+
+def purge(limit: int = 100, batch_size: int = BATCH_SIZE) -> int:
+    """Purge up to ``limit`` soft-deleted articles; returns how many were purged"""
+    article_pks = list(Article.objects.filter(is_deleted=True).order_by('pk').values_list('pk', flat=True)[:limit])
+    for article_pk in article_pks:
+        purge_article(article_pk, batch_size)
+    return len(article_pks)
@@ -0,0 +1,57 @@
+import math
+from datetime import datetime, timezone
+
+from .models import Article, ArticleRanking
+
+
+# Hotness is "votes on a log scale + time since this epoch", so a newer article
+# needs ten times the net votes to outrank one that is 45000 s (12.5 h) older.
+# The time term is fixed at publication, so the score only changes when a vote
+# does and never has to be recomputed as the clock moves.
+HOT_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+HOT_HALF_DAY = 45000
+NEUTRAL_SCORE = 3
+
+
+def hotness(rating_sum: int, rating_count: int, created_at) -> float:
+    net = rating_sum - NEUTRAL_SCORE * rating_count
+    order = math.log10(max(abs(net), 1))
+    sign = (net > 0) - (net < 0)
+    seconds = (created_at - HOT_EPOCH).total_seconds()
+    return round(sign * order + seconds / HOT_HALF_DAY, 7)
+
+
+def _ranking_values(rating_sum: int, rating_count: int, created_at) -> dict:
+    return {
+        'mean_rating': round(rating_sum / rating_count, 4) if rating_count else 0.0,
+        'vote_count': rating_count,
+        'hotness': hotness(rating_sum, rating_count, created_at),
+    }
+
+
+def refresh_ranking(article_pk: int) -> None:
+    """Recompute one article's ranking row from its stored rating counters.
+
+    Call inside the transaction that changed the counters: the counter UPDATE
+    holds the article row lock, so concurrent votes are applied in order.
+    """
+    article = Article.objects.only('rating_sum', 'rating_count', 'created_at').get(pk=article_pk)
+    ArticleRanking.objects.update_or_create(
+        article_id=article_pk,
+        defaults=_ranking_values(article.rating_sum, article.rating_count, article.created_at),
+    )
+
+
+def rebuild_rankings(queryset=None) -> int:
+    """Rewrite the ranking rows for ``queryset`` (default all articles); run inside a transaction"""
+    if queryset is None:
+        queryset = Article.objects.all()
+    rows = [
+        ArticleRanking(article_id=pk, **_ranking_values(rating_sum, rating_count, created_at))
+        for pk, rating_sum, rating_count, created_at in queryset.filter(rating_count__gt=0).values_list(
+            'pk', 'rating_sum', 'rating_count', 'created_at'
+        )
+    ]
+    ArticleRanking.objects.filter(article__in=queryset).delete()
+    ArticleRanking.objects.bulk_create(rows)
+    return len(rows)
@@ -0,0 +1,179 @@
+"""Write-behind mode for reactions.
+
+With ``HABR_REACTION_WRITES = 'buffered'`` in settings, a like, dislike,
+bookmark or rating is appended to ``ReactionEvent`` (one INSERT on a table
+nobody else writes to) instead of touching the reaction tables and the
+article's counter row. ``flush()``, run by the ``flush_reactions`` command,
+collapses the queued events to the last one per (article, user, kind) and
+applies them with bulk inserts/deletes and one counter UPDATE per article,
+so a trending article takes one row lock per flush instead of one per
+click.
+
+Until a flush the reacting user still sees their own state: the viewer
+annotations (habr.viewer_state) prefer a pending event over the reaction
+tables, and ``add_own_deltas()`` adjusts the counters they are shown.
+Flush the queue before switching back to ``'direct'``.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from . import counters, ranking
+from .models import Article, ArticleRating, Bookmark, ReactionEvent
+
+
+MODE = getattr(settings, 'HABR_REACTION_WRITES', 'direct')
+FLUSH_BATCH_SIZE = 1000
+# Keeps IN lists well under SQL Server's 2100 parameter limit
+CHUNK_SIZE = 500
+
+# kind -> (reaction model, stored counter or None)
+FLAG_KINDS = {
+    'like': (Article.likes.through, 'likes_total'),
+    'dislike': (Article.dislikes.through, 'dislikes_total'),
+    'bookmark': (Bookmark, None),
+}
+
+
+def is_enabled() -> bool:
+    return MODE == 'buffered'
+
+
+def record(user, article_pk: int, **values) -> None:
+    """Queue ``kind=value`` events for one user and article in a single INSERT"""
+    ReactionEvent.objects.bulk_create([
+        ReactionEvent(article_id=article_pk, user_id=user.pk, kind=kind, value=int(value))
+        for kind, value in values.items()
+    ])
+
+
+def pending(user, article_pk: int) -> dict:
+    """The latest queued value of each kind for this user and article"""
+    events = ReactionEvent.objects.filter(article_id=article_pk, user_id=user.pk).order_by('pk')
+    return dict(events.values_list('kind', 'value'))
+
+
+def current_flag(user, article_pk: int, kind: str) -> bool:
+    """Whether the user has the ``kind`` reaction, counting queued events"""
+    latest = pending(user, article_pk).get(kind)
+    if latest is not None:
+        return bool(latest)
+    model, _ = FLAG_KINDS[kind]
+    return model.objects.filter(article_id=article_pk, user_id=user.pk).exists()
+
+
+def add_own_deltas(article) -> None:
+    """Show the viewer the counters of ``article`` as they will be once their queued events are flushed.
+
+    ``article`` must carry the habr.viewer_state annotations, which in this
+    mode include the already applied reactions next to the effective ones.
+    """
+    if not is_enabled() or not hasattr(article, 'applied_rating'):
+        return
+    article.likes_total += article.is_liked - article.applied_like
+    article.dislikes_total += article.is_disliked - article.applied_dislike
+    if article.user_rating is not None:
+        article.rating_sum += article.user_rating - (article.applied_rating or 0)
+        article.rating_count += article.applied_rating is None
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing(model, pairs: list, *fields) -> dict:
+    """(article_id, user_id) -> (pk, *fields) for the rows among ``pairs`` that exist"""
+    wanted = set(pairs)
+    found = {}
+    for chunk in _chunks(pairs):
+        rows = model.objects.filter(
+            article_id__in={article_id for article_id, _ in chunk},
+            user_id__in={user_id for _, user_id in chunk},
+        ).values_list('article_id', 'user_id', 'pk', *fields)
+        for article_id, user_id, *rest in rows:
+            if (article_id, user_id) in wanted:
+                found[article_id, user_id] = tuple(rest)
+    return found
+
+
+def _apply_flags(model, counter, wanted: dict, deltas) -> None:
+    existing = _existing(model, list(wanted))
+    added = [pair for pair, on in wanted.items() if on and pair not in existing]
+    removed = [pair for pair, on in wanted.items() if not on and pair in existing]
+    model.objects.bulk_create(
+        [model(article_id=article_id, user_id=user_id) for article_id, user_id in added], batch_size=CHUNK_SIZE
+    )
+    for chunk in _chunks([existing[pair][0] for pair in removed]):
+        model.objects.filter(pk__in=chunk).delete()
+    if counter:
+        for article_id, _ in added:
+            deltas[article_id][counter] += 1
+        for article_id, _ in removed:
+            deltas[article_id][counter] -= 1
+
+
+def _apply_ratings(wanted: dict, deltas) -> None:
+    existing = _existing(ArticleRating, list(wanted), 'score')
+    created, changed = [], []
+    for (article_id, user_id), score in wanted.items():
+        if (article_id, user_id) not in existing:
+            created.append(ArticleRating(article_id=article_id, user_id=user_id, score=score))
+            deltas[article_id]['rating_sum'] += score
+            deltas[article_id]['rating_count'] += 1
+        else:
+            pk, previous = existing[article_id, user_id]
+            if previous != score:
+                changed.append(ArticleRating(pk=pk, score=score))
+                deltas[article_id]['rating_sum'] += score - previous
+    ArticleRating.objects.bulk_create(created, batch_size=CHUNK_SIZE)
+    ArticleRating.objects.bulk_update(changed, ['score'], batch_size=CHUNK_SIZE)
+
+
+def _claimed_elsewhere(events: list) -> set:
+    """(article_id, user_id, kind) of the older events another flush holds locked right now"""
+    mine = {event[0] for event in events}
+    older = ReactionEvent.objects.filter(pk__lte=events[-1][0]).values_list('pk', 'article_id', 'user_id', 'kind')
+    return {(article_id, user_id, kind) for pk, article_id, user_id, kind in older if pk not in mine}
+
+
+def flush(batch_size: int = FLUSH_BATCH_SIZE) -> int:
+    """Apply up to ``batch_size`` queued events; returns how many were consumed.
+
+    The events are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` and
+    deleted in the same transaction as the writes they produce, so
+    concurrent flushes (several workers, in any process) never apply an
+    event twice. An event whose article, user and kind also has an older
+    event claimed by another flush is left for a later round, so a newer
+    value is never overwritten by an older one.
+    """
+    with transaction.atomic():
+        events = list(
+            ReactionEvent.objects.select_for_update(skip_locked=True).order_by('pk')
+            .values_list('pk', 'article_id', 'user_id', 'kind', 'value')[:batch_size]
+        )
+        if not events:
+            return 0
+        busy = _claimed_elsewhere(events)
+        events = [event for event in events if event[1:4] not in busy]
+
+        latest = defaultdict(dict)
+        for _, article_id, user_id, kind, value in events:
+            latest[kind][article_id, user_id] = value
+
+        deltas = defaultdict(Counter)
+        for kind, (model, counter) in FLAG_KINDS.items():
+            if latest[kind]:
+                _apply_flags(model, counter, latest[kind], deltas)
+        if latest['rating']:
+            _apply_ratings(latest['rating'], deltas)
+
+        for article_id, changes in deltas.items():
+            counters.bump(article_id, **changes)
+        for article_id in {article_id for article_id, _ in latest['rating']}:
+            ranking.refresh_ranking(article_id)
+        # By pk rather than a range, so events committed meanwhile are not lost
+        for chunk in _chunks([event[0] for event in events]):
+            ReactionEvent.objects.filter(pk__in=chunk).delete()
+    return len(events)
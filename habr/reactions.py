@@ -0,0 +1,107 @@
+"""Write path for likes, dislikes, bookmarks and ratings.
+
+Every reaction change is one INSERT or one DELETE of the (article, user)
+row, and the stored counters move by the number of rows that statement
+actually touched. The unique (article, user) constraints do the
+arbitration: of two racing inserts one hits the constraint and changes
+nothing, of two racing deletes one deletes nothing, so the counters cannot
+drift however requests interleave.
+
+Passing the wanted state (``liked=True``) makes a call idempotent, which is
+what the forms do so that a double-submit lands where a single click would.
+With ``None`` the current state is read and flipped.
+
+In write-behind mode (habr.reaction_buffer) the same calls only queue an
+event; the counters move when the queue is flushed.
+"""
+from django.db import IntegrityError, transaction
+
+from . import counters, ranking, reaction_buffer
+from .models import Article, ArticleRating, Bookmark
+
+
+Like = Article.likes.through
+Dislike = Article.dislikes.through
+
+
+def _insert(model, **fields) -> int:
+    """INSERT one row; 0 when the unique constraint says it is already there"""
+    try:
+        with transaction.atomic():
+            model.objects.create(**fields)
+    except IntegrityError:
+        return 0
+    return 1
+
+
+def _delete(model, **fields) -> int:
+    deleted, _ = model.objects.filter(**fields).delete()
+    return deleted
+
+
+def _vote(model, opposite, field: str, opposite_field: str, user, article_pk: int, on) -> bool:
+    if reaction_buffer.is_enabled():
+        kind, opposite_kind = ('like', 'dislike') if model is Like else ('dislike', 'like')
+        if on is None:
+            on = not reaction_buffer.current_flag(user, article_pk, kind)
+        reaction_buffer.record(user, article_pk, **({kind: True, opposite_kind: False} if on else {kind: False}))
+        return on
+    row = {'article_id': article_pk, 'user_id': user.pk}
+    if on is None:
+        on = not model.objects.filter(**row).exists()
+    with transaction.atomic():
+        if on:
+            removed = _delete(opposite, **row)
+            counters.bump(article_pk, **{field: _insert(model, **row), opposite_field: -removed})
+        else:
+            counters.bump(article_pk, **{field: -_delete(model, **row)})
+    return on
+
+
+def set_like(user, article_pk: int, liked: bool | None = None) -> bool:
+    """Like or unlike (``None`` flips); liking drops a dislike. Returns the new state"""
+    return _vote(Like, Dislike, 'likes_total', 'dislikes_total', user, article_pk, liked)
+
+
+def set_dislike(user, article_pk: int, disliked: bool | None = None) -> bool:
+    """Dislike or undo it (``None`` flips); disliking drops a like. Returns the new state"""
+    return _vote(Dislike, Like, 'dislikes_total', 'likes_total', user, article_pk, disliked)
+
+
+def set_bookmark(user, article_pk: int, bookmarked: bool | None = None) -> bool:
+    if reaction_buffer.is_enabled():
+        if bookmarked is None:
+            bookmarked = not reaction_buffer.current_flag(user, article_pk, 'bookmark')
+        reaction_buffer.record(user, article_pk, bookmark=bookmarked)
+        return bookmarked
+    row = {'article_id': article_pk, 'user_id': user.pk}
+    if bookmarked is None:
+        bookmarked = not Bookmark.objects.filter(**row).exists()
+    if bookmarked:
+        _insert(Bookmark, **row)
+    else:
+        _delete(Bookmark, **row)
+    return bookmarked
+
+
+def rate(user, article_pk: int, score: int) -> int:
+    """Set the user's score, creating the rating on first use"""
+    if reaction_buffer.is_enabled():
+        reaction_buffer.record(user, article_pk, rating=score)
+        return score
+    return _rate(user, article_pk, score)
+
+
+@transaction.atomic
+def _rate(user, article_pk: int, score: int) -> int:
+    row = {'article_id': article_pk, 'user_id': user.pk}
+    if _insert(ArticleRating, score=score, **row):
+        counters.bump(article_pk, rating_sum=score, rating_count=1)
+    else:
+        # Already rated: lock the row so the old score used for the delta stays current
+        previous = ArticleRating.objects.select_for_update().filter(**row).values_list('score', flat=True).get()
+        if previous != score:
+            ArticleRating.objects.filter(**row).update(score=score)
+            counters.bump(article_pk, rating_sum=score - previous)
+    ranking.refresh_ranking(article_pk)
+    return score
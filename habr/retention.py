@@ -0,0 +1,78 @@
+"""Retention of resolved moderation requests.
+
+Approved and rejected edit/delete requests are only needed for a while.
+After ``HABR_MODERATION_RETENTION_DAYS`` they are moved, a batch at a time,
+into ``ModerationArchive`` segments: zlib-compressed JSON Lines holding the
+rows' column values. The latest rejection per article, user and kind lives
+on in ``ModerationRejection``, which is written when a request is rejected.
+"""
+import datetime
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArticleDeleteRequest, ArticleEditRequest, ModerationArchive
+
+
+RETENTION_DAYS = getattr(settings, 'HABR_MODERATION_RETENTION_DAYS', 90)
+BATCH_SIZE = 500
+REQUEST_MODELS = {
+    'edit': ArticleEditRequest,
+    'delete': ArticleDeleteRequest,
+}
+
+
+def _resolved_before(model, cutoff):
+    # Requests resolved before reviewed_at existed fall back to their creation time
+    return model.objects.filter(status__in=('APPROVED', 'REJECTED')).annotate(
+        resolved_at=Coalesce('reviewed_at', 'created_at'),
+    ).filter(resolved_at__lt=cutoff)
+
+
+def archive_batch(kind: str, cutoff, batch_size: int = BATCH_SIZE) -> int:
+    """Move up to ``batch_size`` requests of ``kind`` resolved before ``cutoff`` into one segment"""
+    model = REQUEST_MODELS[kind]
+    columns = [field.attname for field in model._meta.concrete_fields]
+    with transaction.atomic():
+        rows = list(_resolved_before(model, cutoff).order_by('resolved_at', 'pk').values('resolved_at', *columns)[:batch_size])
+        if not rows:
+            return 0
+        lines = (json.dumps({column: row[column] for column in columns}, cls=DjangoJSONEncoder) for row in rows)
+        ModerationArchive.objects.create(
+            kind=kind,
+            count=len(rows),
+            first_resolved_at=rows[0]['resolved_at'],
+            last_resolved_at=rows[-1]['resolved_at'],
+            data=zlib.compress('\n'.join(lines).encode(), 9),
+        )
+        model.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_resolved(days: int = RETENTION_DAYS, batch_size: int = BATCH_SIZE) -> dict:
+    """Archive everything past retention; returns ``{kind: requests archived}``"""
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    archived = {}
+    for kind in REQUEST_MODELS:
+        archived[kind] = 0
+        while moved := archive_batch(kind, cutoff, batch_size):
+            archived[kind] += moved
+    return archived
+
+
+def segment_rows(segment: ModerationArchive) -> list:
+    """The archived requests of one segment as dicts of column values"""
+    return [json.loads(line) for line in zlib.decompress(bytes(segment.data)).decode().splitlines()]
+
+
+def archived_requests(kind: str, **filters) -> list:
+    """Archived requests of ``kind`` whose columns equal ``filters``, e.g. ``article_id=3``"""
+    found = []
+    for segment in ModerationArchive.objects.filter(kind=kind).order_by('first_resolved_at').iterator():
+        found.extend(row for row in segment_rows(segment) if all(row.get(k) == v for k, v in filters.items()))
+    return found
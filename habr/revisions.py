@@ -0,0 +1,194 @@
+"""Article revision history stored as deltas.
+
+Revision 1 of an article, and every ``HABR_REVISION_SNAPSHOT_EVERY``-th
+revision after it, is a full snapshot of ``FIELDS``. The revisions in
+between store only what changed since the previous one: a ``habr.deltas``
+delta per changed text field, and the new value of a changed scalar. Any
+version is rebuilt from at most that many rows, fetched in one query.
+
+Edit requests are stored the same way, as the proposed summary and content
+deltas against the revision the author started from (``base_revision``).
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+
+from . import deltas
+from .models import Article, ArticleEditRequest, ArticleRevision
+
+
+SNAPSHOT_EVERY = getattr(settings, 'HABR_REVISION_SNAPSHOT_EVERY', 10)
+TEXT_FIELDS = ('title', 'summary', 'content')
+SCALAR_FIELDS = ('category_id', 'image_url')
+FIELDS = TEXT_FIELDS + SCALAR_FIELDS
+# Edit requests keep title, category and image URL as plain columns
+REQUEST_DELTA_FIELDS = ('summary', 'content')
+# Each chain is three parameters; stays under SQL Server's 2100 limit
+CHAIN_CHUNK_SIZE = 300
+# Keeps IN lists well under SQL Server's 2100 parameter limit
+CHUNK_SIZE = 500
+
+
+def article_fields(article) -> dict:
+    return {field: getattr(article, field) for field in FIELDS}
+
+
+def checksum(fields: dict) -> str:
+    payload = json.dumps([fields[field] for field in FIELDS], ensure_ascii=False)
+    return hashlib.sha1(payload.encode(), usedforsecurity=False).hexdigest()
+
+
+def diff_fields(old: dict, new: dict, names=FIELDS) -> dict:
+    """The changes from ``old`` to ``new``: deltas for text fields, new values for the rest"""
+    changes = {}
+    for field in names:
+        if old[field] == new[field]:
+            continue
+        changes[field] = deltas.make_delta(old[field], new[field]) if field in TEXT_FIELDS else new[field]
+    return changes
+
+
+def patch_fields(old: dict, changes: dict) -> dict:
+    fields = dict(old)
+    for field, change in changes.items():
+        fields[field] = deltas.apply_delta(old[field], change) if field in TEXT_FIELDS else change
+    return fields
+
+
+def versions(revisions) -> dict:
+    """Rebuild several revisions at once: ``{revision pk: fields}``, one query per chunk"""
+    revisions = list(revisions)
+    rebuilt = {}
+    for start in range(0, len(revisions), CHAIN_CHUNK_SIZE):
+        chunk = revisions[start:start + CHAIN_CHUNK_SIZE]
+        condition = Q()
+        for revision in chunk:
+            condition |= Q(
+                article_id=revision.article_id,
+                number__gte=revision.snapshot_number,
+                number__lte=revision.number,
+            )
+        chains = {}
+        for row in ArticleRevision.objects.filter(condition).order_by('article_id', 'number').values(
+            'article_id', 'number', 'snapshot_number', 'data'
+        ):
+            chains.setdefault(row['article_id'], []).append(row)
+        for revision in chunk:
+            fields = None
+            for row in chains[revision.article_id]:
+                if row['number'] < revision.snapshot_number or row['number'] > revision.number:
+                    continue
+                fields = dict(row['data']) if row['number'] == row['snapshot_number'] else patch_fields(fields, row['data'])
+            rebuilt[revision.pk] = fields
+    return rebuilt
+
+
+def version(revision) -> dict:
+    return versions([revision])[revision.pk]
+
+
+def latest_revisions(article_ids) -> dict:
+    """``{article id: newest revision}`` in one query"""
+    newest = ArticleRevision.objects.filter(article_id=OuterRef('article_id')).order_by('-number').values('number')[:1]
+    return {
+        revision.article_id: revision
+        for revision in ArticleRevision.objects.filter(article_id__in=list(article_ids), number=Subquery(newest))
+        .defer('data')
+    }
+
+
+def record_many(items) -> dict:
+    """Save new revisions for ``[(article_id, fields, author_id)]`` where the text changed.
+
+    Returns ``{article id: its current revision}``, new or unchanged. The
+    article rows stay locked from reading the latest revisions until the new
+    ones are inserted, so concurrent edits of one article take turns instead
+    of both claiming the same revision number.
+    """
+    items = list(items)
+    with transaction.atomic():
+        article_ids = sorted({article_id for article_id, _, _ in items})
+        # In pk order, so two callers locking overlapping articles cannot deadlock
+        for start in range(0, len(article_ids), CHUNK_SIZE):
+            locked = Article.objects.select_for_update().filter(pk__in=article_ids[start:start + CHUNK_SIZE])
+            list(locked.order_by('pk').values_list('pk', flat=True))
+        return _record_locked(items)
+
+
+def _record_locked(items: list) -> dict:
+    latest = latest_revisions(article_id for article_id, _, _ in items)
+    stale = [
+        latest[article_id] for article_id, fields, _ in items
+        if article_id in latest and latest[article_id].checksum != checksum(fields)
+    ]
+    previous = versions(revision for revision in stale if revision.number + 1 - revision.snapshot_number < SNAPSHOT_EVERY)
+
+    current, created = {}, []
+    for article_id, fields, author_id in items:
+        before = latest.get(article_id)
+        digest = checksum(fields)
+        if before is not None and before.checksum == digest:
+            current[article_id] = before
+            continue
+        number = before.number + 1 if before else 1
+        if before is None or before.pk not in previous:
+            revision = ArticleRevision(article_id=article_id, number=number, snapshot_number=number, data=fields)
+        else:
+            revision = ArticleRevision(
+                article_id=article_id, number=number, snapshot_number=before.snapshot_number,
+                data=diff_fields(previous[before.pk], fields),
+            )
+        revision.author_id = author_id
+        revision.checksum = digest
+        created.append(revision)
+        current[article_id] = revision
+    ArticleRevision.objects.bulk_create(created)
+    if created and created[0].pk is None:
+        # Backends that do not return ids from a bulk insert
+        saved = latest_revisions(current)
+        current = {article_id: saved[article_id] for article_id in current}
+    return current
+
+
+def record(article, author=None) -> ArticleRevision:
+    """Save ``article``'s current text as a new revision unless it is already the latest one"""
+    return record_many([(article.pk, article_fields(article), getattr(author, 'pk', None))])[article.pk]
+
+
+def propose_edit(article, user, *, title, category, image_url, summary, content) -> ArticleEditRequest:
+    """Create an edit request storing summary and content as deltas against the current revision"""
+    base = record(article)
+    return ArticleEditRequest.objects.create(
+        article=article,
+        user=user,
+        title=title,
+        category=category,
+        image_url=image_url,
+        base_revision=base,
+        changes=diff_fields(
+            {'summary': article.summary, 'content': article.content},
+            {'summary': summary, 'content': content},
+            names=REQUEST_DELTA_FIELDS,
+        ),
+    )
+
+
+def proposed_fields(edit_requests) -> dict:
+    """``{request pk: the article fields it proposes}`` for requests with their base_revision loaded"""
+    bases = versions({request.base_revision for request in edit_requests if request.base_revision})
+    proposed = {}
+    for request in edit_requests:
+        if request.base_revision is None:
+            continue
+        fields = patch_fields(bases[request.base_revision.pk], request.changes)
+        fields.update(title=request.title, category_id=request.category_id, image_url=request.image_url)
+        proposed[request.pk] = fields
+    return proposed
+
+
+def history(article):
+    """The article's revisions newest first, without their data"""
+    return article.revisions.select_related('author').defer('data')
@@ -0,0 +1,167 @@
+"""Full-text search over approved articles.
+
+The index is two tables: ``SearchDocument`` (one row per indexed article,
+with its length) and ``SearchPosting`` (term -> article with a weighted
+term frequency). Title tokens count three times and summary tokens twice,
+so a match in the title outweighs one buried in the body. Queries are
+ranked with Okapi BM25 in Python from the postings of the query terms
+only, so a search never touches the article bodies.
+
+Each query reads the document frequency of its terms with one grouped
+COUNT, and the corpus size and average length from a short-lived cache.
+A term in more than ``MAX_POSTINGS_PER_TERM`` articles only contributes to
+the articles where it is most frequent, so common words cost a bounded
+number of rows.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count
+
+from .models import Article, SearchDocument, SearchPosting
+
+
+FIELD_WEIGHTS = (('title', 3), ('summary', 2), ('content', 1))
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_TERM_LENGTH = 64
+MAX_POSTINGS_PER_TERM = 2000
+CORPUS_STATS_KEY = 'habr:search:corpus'
+CORPUS_STATS_SECONDS = 300
+
+STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or that the this to was were will with
+    и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было вот
+    от меня еще нет о из ему теперь когда даже ну ли если уже или ни быть был него до вас нибудь опять уж
+    вам ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их чем была сам чтоб без
+    будто чего раз тоже себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом один
+    это эти
+""".split())
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> list:
+    return [
+        token for token in (match.group().lower()[:MAX_TERM_LENGTH] for match in _TOKEN_RE.finditer(text or ''))
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def _term_frequencies(article) -> Counter:
+    frequencies = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(getattr(article, field)):
+            frequencies[token] += weight
+    return frequencies
+
+
+def is_indexable(article) -> bool:
+    return article.is_approved and article.is_published and not article.is_deleted
+
+
+@transaction.atomic
+def index_articles(articles) -> int:
+    """(Re)index ``articles``; ones that are not visible are removed from the index"""
+    articles = list(articles)
+    SearchDocument.objects.filter(article__in=[article.pk for article in articles]).delete()
+
+    documents, postings = [], []
+    for article in articles:
+        if not is_indexable(article):
+            continue
+        frequencies = _term_frequencies(article)
+        document = SearchDocument(article_id=article.pk, length=sum(frequencies.values()))
+        documents.append(document)
+        postings.extend(
+            SearchPosting(term=term, document_id=article.pk, frequency=frequency)
+            for term, frequency in frequencies.items()
+        )
+    SearchDocument.objects.bulk_create(documents)
+    SearchPosting.objects.bulk_create(postings, batch_size=1000)
+    return len(documents)
+
+
+def index_article(article) -> None:
+    index_articles([article])
+
+
+def remove_articles(article_ids) -> None:
+    """Drop articles from the index, e.g. after a bulk update unpublished them"""
+    article_ids = list(article_ids)
+    for start in range(0, len(article_ids), 500):
+        SearchDocument.objects.filter(article__in=article_ids[start:start + 500]).delete()
+
+
+def corpus_stats() -> tuple:
+    """(indexed articles, average document length); a few minutes stale at most"""
+    stats = cache.get(CORPUS_STATS_KEY)
+    if stats is None:
+        corpus = SearchDocument.objects.aggregate(total=Count('pk'), average_length=Avg('length'))
+        stats = (corpus['total'], corpus['average_length'] or 1.0)
+        cache.set(CORPUS_STATS_KEY, stats, CORPUS_STATS_SECONDS)
+    return stats
+
+
+def _postings(terms: set) -> tuple:
+    """({term: matching articles}, {term: [(article_id, frequency, length)]}), capped per term"""
+    fields = ('term', 'document_id', 'frequency', 'document__length')
+    frequencies = dict(
+        SearchPosting.objects.filter(term__in=terms).values('term').annotate(count=Count('pk')).values_list('term', 'count')
+    )
+    rare = [term for term, count in frequencies.items() if count <= MAX_POSTINGS_PER_TERM]
+    rows = list(SearchPosting.objects.filter(term__in=rare).values_list(*fields)) if rare else []
+    for term in frequencies.keys() - set(rare):
+        rows.extend(
+            SearchPosting.objects.filter(term=term).order_by('-frequency').values_list(*fields)[:MAX_POSTINGS_PER_TERM]
+        )
+    postings = defaultdict(list)
+    for term, article_id, frequency, length in rows:
+        postings[term].append((article_id, frequency, length))
+    return frequencies, postings
+
+
+def search(query: str, limit: int = 50) -> list:
+    """Return ``[(article_id, score), ...]`` best first for a free-text query"""
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+
+    total, average_length = corpus_stats()
+    if not total:
+        return []
+    frequencies, postings = _postings(terms)
+    # The cached total can lag behind the live counts
+    total = max([total, *frequencies.values()])
+
+    scores = defaultdict(float)
+    for term, matches in postings.items():
+        matching = frequencies[term]
+        idf = math.log(1 + (total - matching + 0.5) / (matching + 0.5))
+        for article_id, frequency, length in matches:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+            scores[article_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+    return ranked[:limit] if limit else ranked
+
+
+def search_ids(query: str, limit: int = 50) -> list:
+    return [article_id for article_id, _ in search(query, limit)]
+
+
+def rebuild_index(batch_size: int = 500):
+    """Reindex every article in pk order; yields the number indexed per batch"""
+    last_pk = 0
+    while True:
+        batch = list(
+            Article.objects.filter(pk__gt=last_pk).order_by('pk')
+            .only('pk', 'title', 'summary', 'content', 'is_approved', 'is_published', 'is_deleted')[:batch_size]
+        )
+        if not batch:
+            return
+        yield index_articles(batch)
+        last_pk = batch[-1].pk
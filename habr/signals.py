@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import UserProfile
+from . import images
+from .models import Article, Category, UserProfile
+from .navigation import invalidate_categories
+from .page_cache import bump_content_generation
+from .search import index_article
 
 User = get_user_model()
 
@@ -19,3 +24,62 @@ def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
         instance.profile.save()
 
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_category_navigation(sender, **kwargs):
+    """Drop the cached navbar categories and their article counts"""
+    invalidate_categories()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_cached_pages(sender, **kwargs):
+    """Every cached page shows the category menu"""
+    bump_content_generation()
+
+
+@receiver(post_save, sender=Article)
+def update_search_index(sender, instance, **kwargs):
+    """Reindex the article, or drop it from the index when it is no longer visible"""
+    index_article(instance)
+
+
+@receiver(post_save, sender=Article)
+def update_image_variants(sender, instance, **kwargs):
+    """Render thumbnails when the uploaded image changed"""
+    images.update_article_variants(instance)
+
+
+@receiver(post_delete, sender=Article)
+def delete_image_variants(sender, instance, **kwargs):
+    images.delete_variants(instance.image_variants)
+
+
+@receiver(pre_save, sender=Article)
+def remember_previous_image(sender, instance, raw=False, **kwargs):
+    """Note the stored image name so a replaced upload can release its file"""
+    # An upload not yet written to storage will take a new reference on save
+    instance._image_uploaded = bool(instance.image) and not instance.image._committed
+    if raw or instance.pk is None:
+        return
+    instance._previous_image = (
+        Article.objects.filter(pk=instance.pk).values_list('image', flat=True).first() or ''
+    )
+
+
+@receiver(post_save, sender=Article)
+def release_replaced_image(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_image', '')
+    # Re-uploading identical bytes maps to the same name, so the new reference replaces the old one
+    if previous and (previous != (instance.image.name or '') or getattr(instance, '_image_uploaded', False)):
+        default_storage.delete(previous)
+    instance._previous_image = instance.image.name or ''
+
+
+@receiver(post_delete, sender=Article)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        default_storage.delete(instance.image.name)
@@ -0,0 +1,120 @@
+"""Content-addressed media storage.
+
+Files are named after the SHA-256 of their bytes and sharded two levels
+deep under the directory they were uploaded to, e.g.
+``articles/3f/a2/3fa2...e1.png``. Uploading the same bytes twice stores them
+once, and since a name can never point at different content its URL may be
+cached forever (see ``serve_media``).
+
+Because one file can back several articles, ``save()`` takes a reference on
+it (``MediaBlob.refcount``) and ``delete()`` only drops one; the file and its
+row are removed after the commit that dropped the last reference, if no
+upload of the same bytes has taken a new one meanwhile. Files uploaded
+before this storage have no ``MediaBlob`` row and are deleted on the first
+``delete()``.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.views.static import serve
+
+from .models import MediaBlob
+
+
+CONTENT_ADDRESSED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def content_name(name: str, content) -> str:
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    hexdigest = digest.hexdigest()
+    extension = posixpath.splitext(name)[1].lower()
+    return posixpath.join(posixpath.dirname(name), hexdigest[:2], hexdigest[2:4], hexdigest + extension)
+
+
+def acquire(name: str) -> None:
+    """Add a reference to a stored file"""
+    if MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, refcount=1)
+    except IntegrityError:
+        # Another upload of the same bytes created the row first
+        MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+@transaction.atomic
+def release(name: str) -> bool:
+    """Drop a reference; True when none are left and the file may go (see ``remove_unreferenced``)"""
+    blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+    if blob is None:
+        return True
+    if blob.refcount:
+        MediaBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+    return blob.refcount <= 1
+
+
+@transaction.atomic
+def remove_unreferenced(name: str, delete_file) -> bool:
+    """Call ``delete_file()`` and drop the row if ``name`` still has no references.
+
+    The row lock is held while the file goes, so an upload of the same bytes
+    either takes its reference first (and the file stays) or waits and then
+    writes the file again.
+    """
+    blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+    if blob is None:
+        # Content-addressed files always have a row until they are removed
+        if CONTENT_ADDRESSED_NAME.search(name):
+            return False
+    elif blob.refcount:
+        return False
+    delete_file()
+    if blob is not None:
+        blob.delete()
+    return True
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, *args, **kwargs):
+        # Rewriting an existing name rewrites identical bytes
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(*args, **kwargs)
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        name = content_name(name, content)
+        # Referenced before the existence check, so remove_unreferenced() cannot take the file away after it
+        acquire(name)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+    def delete(self, name):
+        if name and release(name):
+            transaction.on_commit(
+                lambda: remove_unreferenced(name, lambda: super(ContentAddressedStorage, self).delete(name))
+            )
+
+
+def serve_media(request, path, document_root=None):
+    """``django.views.static.serve`` that marks content-addressed files as immutable.
+
+    Only used when Django serves media itself (DEBUG); the front web server
+    should send the same header for paths matching CONTENT_ADDRESSED_NAME.
+    """
+    response = serve(request, path, document_root=document_root or settings.MEDIA_ROOT)
+    if CONTENT_ADDRESSED_NAME.search(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,238 @@
+"""In-memory prefix index for search-box autocomplete.
+
+Every approved article title is indexed under each of its words (so
+"tuning" finds "Django performance tuning"), and every author of an
+approved article under their username. Keys live in one sorted list; a
+lookup is two bisects plus a pass over the matching range. Results for
+one- and two-character prefixes, whose ranges are large, are precomputed.
+
+The index is built from the database on first use and then kept current
+in-process by the moderation views. Other workers notice changes through
+a generation counter in the shared cache, checked at most every few
+seconds so that ordinary lookups stay memory-only. Only changes to which
+articles are published bump it; comments and category edits do not.
+"""
+import bisect
+import heapq
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.urls import reverse
+
+from .models import Article
+
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+PRECOMPUTED_PREFIX_LENGTH = 2
+MAX_WORDS_PER_TITLE = 8
+GENERATION_CHECK_SECONDS = 5.0
+GENERATION_KEY = 'habr:suggest:generation'
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.casefold().split())
+
+
+class PrefixIndex:
+    """Sorted (key, rank, identity, item) entries; lower rank sorts first among matches"""
+
+    def __init__(self, items=()):
+        self._keys_by_item = {}
+        entries = []
+        for item in items:
+            identity = (item['type'], item['id'])
+            keys = self.item_keys(item)
+            self._keys_by_item[identity] = keys
+            entries.extend((key, item['rank'], identity, item) for key in keys)
+        entries.sort(key=_sort_key)
+        self._entries = entries
+        self._keys = [entry[0] for entry in entries]
+        self._top = self._compute_top(_short_prefixes(self._keys))
+
+    @staticmethod
+    def item_keys(item) -> list:
+        words = normalize(item['label']).split(' ')[:MAX_WORDS_PER_TITLE]
+        return sorted({' '.join(words[position:]) for position in range(len(words)) if words[position]})
+
+    def __contains__(self, identity):
+        return identity in self._keys_by_item
+
+    def _insert(self, item):
+        identity = (item['type'], item['id'])
+        keys = self.item_keys(item)
+        self._keys_by_item[identity] = keys
+        for key in keys:
+            entry = (key, item['rank'], identity, item)
+            position = bisect.bisect_left(self._entries, _sort_key(entry), key=_sort_key)
+            self._entries.insert(position, entry)
+            self._keys.insert(position, key)
+        return keys
+
+    def _delete(self, identity):
+        keys = self._keys_by_item.pop(identity, [])
+        for key in keys:
+            low = bisect.bisect_left(self._keys, key)
+            high = bisect.bisect_right(self._keys, key)
+            for position in range(low, high):
+                if self._entries[position][2] == identity:
+                    del self._entries[position]
+                    del self._keys[position]
+                    break
+        return keys
+
+    def _range(self, prefix):
+        low = bisect.bisect_left(self._keys, prefix)
+        high = bisect.bisect_left(self._keys, prefix + '\uffff')
+        return self._entries[low:high]
+
+    @staticmethod
+    def _best(entries, limit):
+        # Entries come sorted by key, so an item's first entry is its best match
+        first = {}
+        for entry in entries:
+            first.setdefault(entry[2], entry)
+        return [entry[3] for entry in heapq.nsmallest(limit, first.values(), key=lambda entry: (entry[1], entry[0]))]
+
+    def _compute_top(self, prefixes):
+        return {prefix: self._best(self._range(prefix), MAX_LIMIT) for prefix in prefixes}
+
+    def put(self, item):
+        keys = self._delete((item['type'], item['id'])) + self._insert(item)
+        self._top.update(self._compute_top(_short_prefixes(keys)))
+
+    def discard(self, kind: str, item_id: int):
+        keys = self._delete((kind, item_id))
+        self._top.update(self._compute_top(_short_prefixes(keys)))
+
+    def lookup(self, prefix: str, limit: int = DEFAULT_LIMIT) -> list:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH:
+            return self._top.get(prefix, [])[:limit]
+        return self._best(self._range(prefix), limit)
+
+
+def _sort_key(entry):
+    return entry[:3]
+
+
+def _short_prefixes(keys):
+    return {key[:length] for key in keys for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1) if len(key) >= length}
+
+
+def article_item(article) -> dict:
+    return {
+        'type': 'article',
+        'id': article.pk,
+        'label': article.title,
+        'url': reverse('habr:article_detail', args=[article.pk]),
+        # Most liked first
+        'rank': -article.likes_total,
+    }
+
+
+def author_item(user, article_count: int) -> dict:
+    return {
+        'type': 'author',
+        'id': user.pk,
+        'label': user.username,
+        'url': reverse('habr:author_articles', args=[user.pk]),
+        'rank': -article_count,
+    }
+
+
+def build_index() -> PrefixIndex:
+    User = get_user_model()
+    articles = Article.objects.filter(is_approved=True, is_published=True).only('pk', 'title', 'likes_total')
+    authors = User.objects.annotate(
+        article_count=Count('articles', filter=Q(articles__is_approved=True, articles__is_published=True))
+    ).filter(article_count__gt=0).only('pk', 'username')
+    items = [article_item(article) for article in articles.iterator()]
+    items += [author_item(user, user.article_count) for user in authors.iterator()]
+    return PrefixIndex(items)
+
+
+_lock = threading.Lock()
+_state = {'index': None, 'generation': None, 'checked_at': 0.0}
+
+
+def generation() -> int:
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        cache.add(GENERATION_KEY, 0, timeout=None)
+        value = cache.get(GENERATION_KEY, 0)
+    return value
+
+
+def _bump() -> int:
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+        return 1
+
+
+def invalidate() -> None:
+    """Make every process rebuild its index once the current transaction commits"""
+    transaction.on_commit(_bump)
+
+
+def get_index() -> PrefixIndex:
+    now = time.monotonic()
+    if _state['index'] is not None and now - _state['checked_at'] < GENERATION_CHECK_SECONDS:
+        return _state['index']
+    with _lock:
+        current = generation()
+        if _state['index'] is None or _state['generation'] != current:
+            _state['index'] = build_index()
+            _state['generation'] = current
+        _state['checked_at'] = now
+    return _state['index']
+
+
+def suggest(prefix: str, limit: int = DEFAULT_LIMIT) -> list:
+    return get_index().lookup(prefix, limit)
+
+
+def _apply_on_commit(change) -> None:
+    """Bump the generation and run ``change(index)`` on this process's index once the transaction commits.
+
+    The index adopts the new generation only when this bump is the sole one
+    since the generation it reflects. A bigger jump means another worker
+    changed something this index has not seen, and the next get_index()
+    rebuilds.
+    """
+    def apply():
+        bumped = _bump()
+        with _lock:
+            index, known = _state['index'], _state['generation']
+            if index is None:
+                return
+            change(index)
+            if known is not None and bumped == known + 1:
+                _state['generation'] = bumped
+
+    transaction.on_commit(apply)
+
+
+def article_changed(article) -> None:
+    """Apply an approve/reject/edit of ``article`` to every process's index"""
+    def change(index):
+        if article.is_approved and article.is_published:
+            index.put(article_item(article))
+            if ('author', article.author_id) not in index:
+                index.put(author_item(article.author, 1))
+        else:
+            index.discard('article', article.pk)
+    _apply_on_commit(change)
+
+
+def article_removed(article_pk: int) -> None:
+    """Drop a deleted article from every process's index"""
+    _apply_on_commit(lambda index: index.discard('article', article_pk))
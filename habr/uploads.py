@@ -0,0 +1,110 @@
+"""Upload handling for article images.
+
+``ImageUploadHandler`` replaces Django's default pair of handlers: every
+file goes straight to a temporary file on disk, never into worker memory,
+and the storage later moves that file into place instead of copying it.
+While the body is still arriving the handler checks the first bytes for a
+supported image signature and header dimensions, and stops writing as soon
+as the file passes ``HABR_UPLOAD_MAX_BYTES``. A rejected file is dropped
+(the rest of it is read off the socket and discarded) and the reason is
+left in ``request.upload_errors`` for the form to report.
+"""
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+
+MAX_BYTES = getattr(settings, 'HABR_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+MAX_PIXELS = getattr(settings, 'HABR_UPLOAD_MAX_PIXELS', 50_000_000)
+# Enough for the signature and, for almost every file, the dimensions
+SNIFF_BYTES = 64 * 1024
+
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+ACCEPT = 'image/png,image/jpeg,image/gif,image/webp'
+
+
+def sniff_format(head: bytes) -> str | None:
+    """Image format named by the file's magic bytes, or None"""
+    for signature, fmt in SIGNATURES:
+        if head.startswith(signature):
+            return fmt
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def header_size(head: bytes) -> tuple | None:
+    """(width, height) if the header is within ``head``; Pillow only reads it here"""
+    try:
+        with Image.open(io.BytesIO(head)) as image:
+            return image.size
+    except Exception:
+        # Truncated or unusual header; the form's full check still runs
+        return None
+
+
+def upload_errors(request) -> dict:
+    """Rejection messages by field name for this request's uploads"""
+    return getattr(request, 'upload_errors', {})
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.head = b''
+        self.size = 0
+        self.checked = False
+        if content_length is not None and content_length > MAX_BYTES:
+            self.reject(self.too_large_message())
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > MAX_BYTES:
+            self.reject(self.too_large_message())
+        if not self.checked:
+            self.head += raw_data
+            if len(self.head) >= SNIFF_BYTES:
+                self.reject(self.check_head())
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not self.checked and file_size:
+            # Smaller than SNIFF_BYTES; too late for SkipFile, so just leave it out
+            message = self.check_head()
+            if message:
+                self.record_error(message)
+                self.file.close()
+                return None
+        return super().file_complete(file_size)
+
+    def check_head(self) -> str | None:
+        """Why the start of the file is unacceptable, if it is"""
+        head, self.head, self.checked = self.head, b'', True
+        if sniff_format(head) is None:
+            return 'Only PNG, JPEG, GIF and WebP images are supported.'
+        size = header_size(head)
+        if size and size[0] * size[1] > MAX_PIXELS:
+            return f'The image is too large ({size[0]}×{size[1]} pixels).'
+        return None
+
+    def too_large_message(self) -> str:
+        return f'The file is larger than {filesizeformat(MAX_BYTES)}.'
+
+    def record_error(self, message: str):
+        if not hasattr(self.request, 'upload_errors'):
+            self.request.upload_errors = {}
+        self.request.upload_errors[self.field_name] = message
+
+    def reject(self, message: str | None):
+        if message:
+            self.record_error(message)
+            # The parser closes (and so deletes) the temporary file and skips the rest
+            raise SkipFile(message)
@@ -1,6 +1,8 @@
 from django.urls import path
 
 from . import views
+from .page_cache import anonymous_page_cache
+from .view_counter import count_article_views
 
 
 app_name = "habr"
@@ -12,20 +14,25 @@ urlpatterns = [
     path("logout/", views.logout_view, name="logout"),
     
     # Articles
-    path("", views.ArticleListView.as_view(), name="article_list"),
-    path("popular/", views.PopularArticleListView.as_view(), name="popular_articles"),
-    path("category/<slug:slug>/", views.CategoryArticleListView.as_view(), name="category_articles"),
+    path("", anonymous_page_cache(views.ArticleListView.as_view()), name="article_list"),
+    path("popular/", anonymous_page_cache(views.PopularArticleListView.as_view()), name="popular_articles"),
+    # Before category/<slug:slug>/, which would otherwise match "new"
+    path("category/new/", views.CategoryCreateView.as_view(), name="category_create"),
+    path("category/<slug:slug>/", anonymous_page_cache(views.CategoryArticleListView.as_view()), name="category_articles"),
     path("authors/", views.AuthorListView.as_view(), name="authors"),
     path("author/<int:pk>/", views.AuthorArticleListView.as_view(), name="author_articles"),
     path("favorites/", views.FavoritesListView.as_view(), name="favorites"),
-    path("article/<int:pk>/", views.ArticleDetailView.as_view(), name="article_detail"),
+    path("search/", views.search_view, name="search"),
+    path("article/suggest/", views.suggest_view, name="suggest"),
+    path(
+        "article/<int:pk>/",
+        count_article_views(anonymous_page_cache(views.ArticleDetailView.as_view())),
+        name="article_detail",
+    ),
     path("article/new/", views.ArticleCreateView.as_view(), name="article_create"),
     path("article/<int:pk>/edit/", views.ArticleUpdateView.as_view(), name="article_update"),
     path("article/<int:pk>/delete/", views.ArticleDeleteView.as_view(), name="article_delete"),
     
-    # Categories
-    path("category/new/", views.CategoryCreateView.as_view(), name="category_create"),
-    
     # Actions
     path("article/<int:pk>/like/", views.toggle_like, name="toggle_like"),
     path("article/<int:pk>/dislike/", views.toggle_dislike, name="toggle_dislike"),
@@ -38,9 +45,13 @@ urlpatterns = [
     
     # Comments
     path("article/<int:pk>/comment/", views.add_comment, name="add_comment"),
+    path("article/<int:pk>/comments/", views.article_comments, name="article_comments"),
+    path("article/<int:pk>/history/", views.article_history, name="article_history"),
     
     # Admin panel
     path("admin-panel/", views.admin_panel, name="admin_panel"),
+    path("edit-request/bulk/", views.bulk_edit_requests, name="bulk_edit_requests"),
+    path("delete-request/bulk/", views.bulk_delete_requests, name="bulk_delete_requests"),
     path("edit-request/<int:pk>/approve/", views.approve_edit_request, name="approve_edit_request"),
     path("edit-request/<int:pk>/reject/", views.reject_edit_request, name="reject_edit_request"),
     path("delete-request/<int:pk>/approve/", views.approve_delete_request, name="approve_delete_request"),
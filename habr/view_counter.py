@@ -0,0 +1,125 @@
+"""Article read counts without a write per read.
+
+Views are counted in memory and added to ``Article.view_count`` by a
+background thread every ``HABR_VIEW_FLUSH_SECONDS``, and when the process
+exits. Articles with the
+same pending count share one ``UPDATE ... SET view_count = view_count + n``.
+A visitor (their session, or address and user agent when they have none) is
+counted once per article per ``HABR_VIEW_DEDUPE_SECONDS``.
+
+A worker that is killed outright loses at most one interval of views.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+
+from .models import Article
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SECONDS = getattr(settings, 'HABR_VIEW_FLUSH_SECONDS', 30)
+DEDUPE_SECONDS = getattr(settings, 'HABR_VIEW_DEDUPE_SECONDS', 30 * 60)
+# Keeps IN lists well under SQL Server's 2100 parameter limit
+CHUNK_SIZE = 500
+
+_lock = threading.Lock()
+_pending = Counter()
+_flusher = None
+
+
+def visitor_key(request) -> str:
+    session_key = request.session.session_key if hasattr(request, 'session') else None
+    if session_key:
+        return f'session:{session_key}'
+    raw = f"{request.META.get('REMOTE_ADDR', '')}|{request.META.get('HTTP_USER_AGENT', '')}"
+    return 'client:' + hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+
+
+def record_view(request, article_pk: int) -> bool:
+    """Count a read of ``article_pk`` unless this visitor was counted recently"""
+    if not cache.add(f'habr:viewed:{article_pk}:{visitor_key(request)}', 1, timeout=DEDUPE_SECONDS):
+        return False
+    with _lock:
+        _pending[article_pk] += 1
+    _start_flusher()
+    return True
+
+
+def _start_flusher() -> None:
+    """Start this process's flush thread on its first view (not at import, so forked workers get their own)"""
+    global _flusher
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_periodically, name='habr-view-counter', daemon=True)
+            _flusher.start()
+
+
+def _flush_periodically() -> None:
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        _flush_logged()
+        # The thread sleeps far longer than a connection should sit idle
+        connections.close_all()
+
+
+def _flush_logged() -> None:
+    try:
+        flush()
+    except DatabaseError:
+        # The counts wait in the buffer for the next flush; at exit they are lost
+        logger.exception('Could not write buffered article views')
+
+
+def flush() -> int:
+    """Write the buffered counts to the database; returns how many views were written.
+
+    All chunks are written in one transaction, so after a ``DatabaseError``
+    nothing was written and every count goes back into the buffer.
+    """
+    global _pending
+    with _lock:
+        counts, _pending = _pending, Counter()
+    if not counts:
+        return 0
+    by_count = defaultdict(list)
+    for article_pk, count in counts.items():
+        by_count[count].append(article_pk)
+    try:
+        with transaction.atomic():
+            for count, article_pks in by_count.items():
+                for start in range(0, len(article_pks), CHUNK_SIZE):
+                    Article.objects.filter(pk__in=article_pks[start:start + CHUNK_SIZE]).update(
+                        view_count=F('view_count') + count
+                    )
+    except DatabaseError:
+        # Keep the counts for the next attempt
+        with _lock:
+            _pending.update(counts)
+        raise
+    return sum(counts.values())
+
+
+atexit.register(_flush_logged)
+
+
+def count_article_views(view):
+    """Record a read for every successful GET of ``view``, including ones served from the page cache"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method == 'GET' and response.status_code == 200:
+            record_view(request, kwargs['pk'])
+        return response
+
+    return wrapper
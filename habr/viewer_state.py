@@ -0,0 +1,71 @@
+from django.db.models import BooleanField, Case, Exists, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact
+
+from . import reaction_buffer
+from .models import Article, ArticleDeleteRequest, ArticleEditRequest, ArticleRating, Bookmark, ModerationRejection, ReactionEvent
+
+
+def reaction_flags(user) -> dict:
+    """Expressions for the viewer's ``is_liked``, ``is_disliked``, ``is_bookmarked`` and ``user_rating``.
+
+    In write-behind mode a queued event wins over the reaction tables, so
+    users see their own reactions before the queue is flushed.
+    """
+    def mine(model_queryset):
+        return model_queryset.filter(article_id=OuterRef('pk'), user_id=user.pk)
+
+    flags = {
+        'is_liked': Exists(mine(Article.likes.through.objects)),
+        'is_disliked': Exists(mine(Article.dislikes.through.objects)),
+        'is_bookmarked': Exists(mine(Bookmark.objects)),
+        'user_rating': Subquery(mine(ArticleRating.objects).values('score')[:1]),
+    }
+    if not reaction_buffer.is_enabled():
+        return flags
+
+    def queued(kind):
+        return Subquery(mine(ReactionEvent.objects).filter(kind=kind).order_by('-pk').values('value')[:1])
+
+    # The applied values stay available for habr.reaction_buffer.add_own_deltas()
+    flags.update({
+        'applied_like': flags['is_liked'],
+        'applied_dislike': flags['is_disliked'],
+        'applied_rating': flags['user_rating'],
+    })
+    for name, kind in (('is_liked', 'like'), ('is_disliked', 'dislike'), ('is_bookmarked', 'bookmark')):
+        flags[name] = Case(
+            When(Exact(queued(kind), 1), then=Value(True)),
+            When(Exact(queued(kind), 0), then=Value(False)),
+            When(flags[name], then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+    flags['user_rating'] = Coalesce(queued('rating'), flags['user_rating'])
+    return flags
+
+
+def with_viewer_state(queryset, user, moderation: bool = False):
+    """Annotate each article with the viewer's own flags, inside the same SELECT.
+
+    Adds ``is_liked``, ``is_disliked``, ``is_bookmarked`` and ``user_rating``.
+    With ``moderation=True`` it also adds ``has_pending_edit``,
+    ``has_pending_delete`` and the ids of the viewer's ``ModerationRejection``
+    summaries for the article (``rejected_edit_id``, ``rejected_delete_id``).
+    Anonymous viewers get the queryset back unchanged.
+    """
+    if not user.is_authenticated:
+        return queryset
+
+    def mine(model_queryset):
+        return model_queryset.filter(article_id=OuterRef('pk'), user_id=user.pk)
+
+    annotations = reaction_flags(user)
+    if moderation:
+        annotations.update({
+            'has_pending_edit': Exists(mine(ArticleEditRequest.objects).filter(status='PENDING')),
+            'has_pending_delete': Exists(mine(ArticleDeleteRequest.objects).filter(status='PENDING')),
+            'rejected_edit_id': Subquery(mine(ModerationRejection.objects).filter(kind='edit').values('pk')[:1]),
+            'rejected_delete_id': Subquery(mine(ModerationRejection.objects).filter(kind='delete').values('pk')[:1]),
+        })
+    return queryset.annotate(**annotations)
@@ -1,15 +1,23 @@
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.db.models import Avg, Count, Q
-
-from django.utils import timezone
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from . import counters, deltas, moderation, purge, reaction_buffer, reactions, revisions, search, suggest
+from .card_cache import CachedCardsMixin, attach_cards
+from .feeds import article_feed
+from .navigation import get_category
+from .page_cache import bump_content_generation
+from .viewer_state import reaction_flags, with_viewer_state
 from .forms import ArticleForm, CategoryForm, RegisterForm, RatingForm
-from .models import Article, Category, UserProfile, Bookmark, ArticleRating, Comment, ArticleEditRequest, ArticleDeleteRequest
+from .models import Article, Category, UserProfile, Bookmark, Comment, ArticleEditRequest, ArticleDeleteRequest, ModerationRejection
+from .pagination import KeysetPaginationMixin, KeysetPaginator
+from .uploads import upload_errors
 
 
 # Authentication views
@@ -51,51 +59,74 @@ def logout_view(request):
     return redirect('habr:article_list')
 
 
+COMMENTS_PER_PAGE = 20
+
+
+def comment_page(article, cursor=None):
+    """One keyset page of an article's comments, newest first, authors joined"""
+    comments = Comment.objects.filter(article=article).select_related('user')
+    return KeysetPaginator(comments, COMMENTS_PER_PAGE).page(cursor)
+
+
 # Article views
-class ArticleListView(ListView):
+class ArticleListView(CachedCardsMixin, KeysetPaginationMixin, ListView):
     model = Article
     template_name = "habr/article_list.html"
     context_object_name = "articles"
 
     def get_queryset(self):
-        return Article.objects.filter(is_approved=True, is_published=True)
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
-        return context
+        return article_feed(viewer=self.request.user)
 
 
-class PopularArticleListView(ListView):
+class PopularArticleListView(CachedCardsMixin, KeysetPaginationMixin, ListView):
     model = Article
     template_name = "habr/article_list.html"
     context_object_name = "articles"
+    # Served from the precomputed ArticleRanking rows (see habr.ranking)
+    sort_orderings = {
+        'top': ('-avg_rating', '-created_at', '-id'),
+        'hot': ('-hotness', '-id'),
+        'new': ('-created_at', '-id'),
+        'read': ('-view_count', '-id'),
+    }
+    default_sort = 'top'
+
+    def get_sort(self):
+        sort = self.request.GET.get('sort')
+        return sort if sort in self.sort_orderings else self.default_sort
+
+    def get_keyset_ordering(self):
+        return self.sort_orderings[self.get_sort()]
 
     def get_queryset(self):
-        return Article.objects.filter(is_approved=True, is_published=True).annotate(
-            avg_rating=Avg('ratings__score')
-        ).filter(avg_rating__gte=4.0).order_by('-avg_rating', '-created_at')
+        if self.get_sort() == 'read':
+            # Most read counts every article, rated or not
+            return article_feed(viewer=self.request.user, view_count__gt=0)
+        queryset = article_feed(viewer=self.request.user, ranking__vote_count__gt=0).annotate(
+            avg_rating=F('ranking__mean_rating'),
+            hotness=F('ranking__hotness'),
+        )
+        if self.get_sort() == 'top':
+            queryset = queryset.filter(avg_rating__gte=4.0)
+        return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
+        context['sort'] = self.get_sort()
+        context['sort_choices'] = list(self.sort_orderings)
         return context
 
 
-class CategoryArticleListView(ListView):
+class CategoryArticleListView(CachedCardsMixin, KeysetPaginationMixin, ListView):
     model = Article
     template_name = "habr/article_list.html"
     context_object_name = "articles"
 
     def get_queryset(self):
-        category_slug = self.kwargs.get('slug')
-        category = get_object_or_404(Category, slug=category_slug)
-        return Article.objects.filter(category=category, is_approved=True, is_published=True)
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
-        return context
+        category = get_category(self.kwargs.get('slug'))
+        if category is None:
+            raise Http404("No category matches the given query.")
+        return article_feed(viewer=self.request.user, category=category)
 
 
 class AuthorListView(ListView):
@@ -110,13 +141,8 @@ class AuthorListView(ListView):
             article_count=Count('articles', filter=Q(articles__is_approved=True, articles__is_published=True))
         ).filter(article_count__gt=0).order_by('-article_count')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
-        return context
-
 
-class AuthorArticleListView(ListView):
+class AuthorArticleListView(CachedCardsMixin, KeysetPaginationMixin, ListView):
     model = Article
     template_name = "habr/article_list.html"
     context_object_name = "articles"
@@ -125,83 +151,96 @@ class AuthorArticleListView(ListView):
         from django.contrib.auth import get_user_model
         User = get_user_model()
         author = get_object_or_404(User, pk=self.kwargs.get('pk'))
-        return Article.objects.filter(author=author, is_approved=True, is_published=True)
+        return article_feed(viewer=self.request.user, author=author)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
-        return context
 
-
-class FavoritesListView(LoginRequiredMixin, ListView):
+class FavoritesListView(LoginRequiredMixin, CachedCardsMixin, KeysetPaginationMixin, ListView):
     model = Article
     template_name = "habr/article_list.html"
     context_object_name = "articles"
+    show_choices = ('all', 'liked', 'bookmarked')
+
+    def get_show(self):
+        show = self.request.GET.get('show')
+        return show if show in self.show_choices else 'all'
 
     def get_queryset(self):
         user = self.request.user
-        # Articles liked by the user
-        liked_qs = Article.objects.filter(likes=user, is_approved=True, is_published=True)
-        # Articles bookmarked by the user (through Bookmark model)
-        bookmarked_qs = Article.objects.filter(bookmarked_by__user=user, is_approved=True, is_published=True)
-        # Merge safely at Python level (avoid UNION/DISTINCT which can fail on SQL Server)
-        combined = {a.id: a for a in list(liked_qs) + list(bookmarked_qs)}
-        # Keep consistent ordering (newest first) like default Article Meta ordering
-        return sorted(combined.values(), key=lambda a: a.created_at, reverse=True)
+        flags = reaction_flags(user)
+        liked, bookmarked = flags['is_liked'], flags['is_bookmarked']
+        # EXISTS filters instead of joins: no duplicate rows, so no UNION/DISTINCT (which can fail on SQL Server)
+        conditions = {'all': liked | bookmarked, 'liked': liked, 'bookmarked': bookmarked}
+        return article_feed(viewer=user).filter(conditions[self.get_show()])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all()
+        context['show'] = self.get_show()
+        context['show_choices'] = self.show_choices
         return context
 
 
+SEARCH_RESULTS_LIMIT = 50
+
+
+def search_view(request: HttpRequest) -> HttpResponse:
+    query = request.GET.get('q', '').strip()
+    article_ids = search.search_ids(query, SEARCH_RESULTS_LIMIT) if query else []
+    found = article_feed(viewer=request.user, pk__in=article_ids).in_bulk()
+    # Keep the BM25 order; ids of articles hidden since indexing are skipped
+    articles = [found[pk] for pk in article_ids if pk in found]
+    for article in articles:
+        reaction_buffer.add_own_deltas(article)
+    attach_cards(articles)
+    context = {
+        'articles': articles,
+        'search_query': query,
+    }
+    return render(request, 'habr/article_list.html', context)
+
+
+def suggest_view(request: HttpRequest) -> JsonResponse:
+    """Autocomplete for the search box, served from the in-memory prefix index"""
+    query = request.GET.get('q', '')
+    try:
+        limit = min(max(int(request.GET.get('limit', suggest.DEFAULT_LIMIT)), 1), suggest.MAX_LIMIT)
+    except ValueError:
+        limit = suggest.DEFAULT_LIMIT
+    results = [
+        {'type': item['type'], 'id': item['id'], 'label': item['label'], 'url': item['url']}
+        for item in suggest.suggest(query, limit)
+    ]
+    return JsonResponse({'query': query, 'results': results})
+
+
 class ArticleDetailView(DetailView):
     model = Article
     template_name = "habr/article_detail.html"
     context_object_name = "article"
 
     def get_queryset(self):
-        return Article.objects.filter(is_approved=True, is_published=True)
+        queryset = Article.objects.filter(is_approved=True, is_published=True).select_related('author', 'category')
+        # Per-user flags are annotated onto the article row itself
+        return with_viewer_state(queryset, self.request.user, moderation=True)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if self.request.user.is_authenticated:
-            context['is_bookmarked'] = Bookmark.objects.filter(
-                user=self.request.user,
-                article=self.object
-            ).exists()
-            try:
-                context['user_rating'] = ArticleRating.objects.get(
-                    article=self.object,
-                    user=self.request.user
-                ).score
-            except ArticleRating.DoesNotExist:
-                context['user_rating'] = None
-            # Check for pending edit/delete requests
-            context['has_pending_edit'] = ArticleEditRequest.objects.filter(
-                article=self.object,
-                user=self.request.user,
-                status='PENDING'
-            ).exists()
-            context['has_pending_delete'] = ArticleDeleteRequest.objects.filter(
-                article=self.object,
-                user=self.request.user,
-                status='PENDING'
-            ).exists()
-            # Get most recent rejected requests
-            rejected_edit = ArticleEditRequest.objects.filter(
-                article=self.object,
-                user=self.request.user,
-                status='REJECTED'
-            ).order_by('-created_at').first()
-            context['rejected_edit'] = rejected_edit
-            rejected_delete = ArticleDeleteRequest.objects.filter(
-                article=self.object,
-                user=self.request.user,
-                status='REJECTED'
-            ).order_by('-created_at').first()
-            context['rejected_delete'] = rejected_delete
-        context['comments'] = self.object.comments.all()
+            article = self.object
+            reaction_buffer.add_own_deltas(article)
+            context['is_liked'] = article.is_liked
+            context['is_disliked'] = article.is_disliked
+            context['is_bookmarked'] = article.is_bookmarked
+            context['user_rating'] = article.user_rating
+            context['has_pending_edit'] = article.has_pending_edit
+            context['has_pending_delete'] = article.has_pending_delete
+            # The rejection summaries themselves are only loaded when there is one
+            context['rejected_edit'] = (
+                ModerationRejection.objects.get(pk=article.rejected_edit_id) if article.rejected_edit_id else None
+            )
+            context['rejected_delete'] = (
+                ModerationRejection.objects.get(pk=article.rejected_delete_id) if article.rejected_delete_id else None
+            )
+        context['comments'] = comment_page(self.object, self.request.GET.get('comments'))
         return context
 
 
@@ -211,15 +250,21 @@ class ArticleCreateView(LoginRequiredMixin, CreateView):
     template_name = "habr/article_form.html"
     success_url = reverse_lazy("habr:article_list")
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'upload_errors': upload_errors(self.request)}
+
     def form_valid(self, form):
         form.instance.author = self.request.user
         form.instance.is_approved = False  # Needs admin approval
         form.instance.is_published = False
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        revisions.record(self.object, self.request.user)
+        return response
 
 
 class ArticleUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     model = Article
+    queryset = Article.objects.filter(is_deleted=False)
     form_class = ArticleForm
     template_name = "habr/article_form.html"
 
@@ -232,6 +277,9 @@ class ArticleUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
             return True  # Admins can edit directly
         return article.author == user
 
+    def get_form_kwargs(self):
+        return {**super().get_form_kwargs(), 'upload_errors': upload_errors(self.request)}
+
     def form_valid(self, form):
         article = self.get_object()
         user = self.request.user
@@ -241,25 +289,30 @@ class ArticleUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         if profile and profile.is_admin:
             form.instance.is_approved = False  # Needs re-approval after edit
             form.instance.is_published = False
-            return super().form_valid(form)
+            response = super().form_valid(form)
+            revisions.record(self.object, user)
+            bump_content_generation()
+            suggest.article_changed(self.object)
+            return response
         
         # For regular users, create an edit request
-        ArticleEditRequest.objects.create(
-            article=article,
-            user=user,
+        revisions.propose_edit(
+            article,
+            user,
             title=form.cleaned_data['title'],
             category=form.cleaned_data['category'],
             image_url=form.cleaned_data.get('image_url', ''),
             summary=form.cleaned_data['summary'],
             content=form.cleaned_data['content'],
-            status='PENDING'
         )
         return redirect('habr:article_detail', pk=article.pk)
 
 
 class ArticleDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     model = Article
+    queryset = Article.objects.filter(is_deleted=False)
     template_name = "habr/article_confirm_delete.html"
+    success_url = reverse_lazy("habr:article_list")
 
     def test_func(self):
         article = self.get_object()
@@ -270,14 +323,16 @@ class ArticleDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
             return True  # Admins can delete directly
         return article.author == user
 
-    def delete(self, request, *args, **kwargs):
-        article = self.get_object()
+    def form_valid(self, form):
+        # DeleteView.post() ends here; delete() is no longer called since Django 4.0
+        article = self.object
         user = self.request.user
         profile = getattr(user, 'profile', None)
         
-        # If user is admin, delete directly
+        # If user is admin, hide it now; habr.purge deletes it in the background
         if profile and profile.is_admin:
-            return super().delete(request, *args, **kwargs)
+            purge.soft_delete([article.pk])
+            return redirect(self.get_success_url())
         
         # For regular users, create a delete request
         ArticleDeleteRequest.objects.create(
@@ -295,73 +350,77 @@ class CategoryCreateView(LoginRequiredMixin, CreateView):
 
 
 # Action views
+def wants_json(request: HttpRequest) -> bool:
+    """True when the client asked for JSON over HTML (the reaction buttons' fetch calls do)"""
+    return request.get_preferred_type(['text/html', 'application/json']) == 'application/json'
+
+
+def reaction_response(request: HttpRequest, article_pk: int, **state) -> HttpResponse:
+    """Answer a reaction with the viewer's new ``state`` and the article counters, or redirect back"""
+    if not wants_json(request):
+        referer = request.META.get("HTTP_REFERER")
+        if referer:
+            return redirect(referer)
+        return redirect("habr:article_detail", pk=article_pk)
+    queryset = Article.objects.only('likes_total', 'dislikes_total', 'rating_sum', 'rating_count')
+    if reaction_buffer.is_enabled():
+        queryset = with_viewer_state(queryset, request.user)
+    article = queryset.get(pk=article_pk)
+    reaction_buffer.add_own_deltas(article)
+    return JsonResponse({
+        'article': article_pk,
+        'state': state,
+        'counters': {
+            'likes': article.likes_count,
+            'dislikes': article.dislikes_count,
+            'rating': article.rating,
+            'rating_count': article.rating_count,
+        },
+    })
+
+
+def requested_state(request: HttpRequest) -> bool | None:
+    """The ``state`` the form asks for (on/off), or None to flip the current one"""
+    return {'on': True, 'off': False}.get(request.POST.get('state'))
+
+
 @login_required
 def toggle_like(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid method")
-    article = get_object_or_404(Article, pk=pk)
-    user = request.user
-    if article.likes.filter(pk=user.pk).exists():
-        article.likes.remove(user)
-    else:
-        article.dislikes.remove(user)
-        article.likes.add(user)
-    referer = request.META.get("HTTP_REFERER")
-    if referer:
-        return redirect(referer)
-    return redirect("habr:article_detail", pk=article.pk)
+    article = get_object_or_404(Article.objects.only('pk'), pk=pk, is_deleted=False)
+    liked = reactions.set_like(request.user, article.pk, requested_state(request))
+    return reaction_response(request, article.pk, liked=liked, disliked=False)
 
 
 @login_required
 def toggle_dislike(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid method")
-    article = get_object_or_404(Article, pk=pk)
-    user = request.user
-    if article.dislikes.filter(pk=user.pk).exists():
-        article.dislikes.remove(user)
-    else:
-        article.likes.remove(user)
-        article.dislikes.add(user)
-    referer = request.META.get("HTTP_REFERER")
-    if referer:
-        return redirect(referer)
-    return redirect("habr:article_detail", pk=article.pk)
+    article = get_object_or_404(Article.objects.only('pk'), pk=pk, is_deleted=False)
+    disliked = reactions.set_dislike(request.user, article.pk, requested_state(request))
+    return reaction_response(request, article.pk, liked=False, disliked=disliked)
 
 
 @login_required
 def toggle_bookmark(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid method")
-    article = get_object_or_404(Article, pk=pk)
-    user = request.user
-    bookmark, created = Bookmark.objects.get_or_create(user=user, article=article)
-    if not created:
-        bookmark.delete()
-    referer = request.META.get("HTTP_REFERER")
-    if referer:
-        return redirect(referer)
-    return redirect("habr:article_detail", pk=article.pk)
+    article = get_object_or_404(Article.objects.only('pk'), pk=pk, is_deleted=False)
+    bookmarked = reactions.set_bookmark(request.user, article.pk, requested_state(request))
+    return reaction_response(request, article.pk, bookmarked=bookmarked)
 
 
 @login_required
 def rate_article(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid method")
-    article = get_object_or_404(Article, pk=pk)
-    user = request.user
+    article = get_object_or_404(Article.objects.only('pk'), pk=pk, is_deleted=False)
     score = int(request.POST.get('score', 5))
     if score < 1 or score > 5:
         score = 5
-    rating, created = ArticleRating.objects.update_or_create(
-        article=article,
-        user=user,
-        defaults={'score': score}
-    )
-    referer = request.META.get("HTTP_REFERER")
-    if referer:
-        return redirect(referer)
-    return redirect("habr:article_detail", pk=article.pk)
+    reactions.rate(request.user, article.pk, score)
+    return reaction_response(request, article.pk, user_rating=score)
 
 
 # Admin views
@@ -369,7 +428,7 @@ def rate_article(request: HttpRequest, pk: int) -> HttpResponse:
 def approve_article(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid method")
-    article = get_object_or_404(Article, pk=pk)
+    article = get_object_or_404(Article, pk=pk, is_deleted=False)
     user = request.user
     profile = getattr(user, 'profile', None)
     if not profile or not profile.is_admin:
@@ -377,6 +436,8 @@ def approve_article(request: HttpRequest, pk: int) -> HttpResponse:
     article.is_approved = True
     article.is_published = True
     article.save()
+    bump_content_generation()
+    suggest.article_changed(article)
     return redirect('habr:article_detail', pk=article.pk)
 
 
@@ -384,7 +445,7 @@ def approve_article(request: HttpRequest, pk: int) -> HttpResponse:
 def reject_article(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid method")
-    article = get_object_or_404(Article, pk=pk)
+    article = get_object_or_404(Article, pk=pk, is_deleted=False)
     user = request.user
     profile = getattr(user, 'profile', None)
     if not profile or not profile.is_admin:
@@ -392,6 +453,8 @@ def reject_article(request: HttpRequest, pk: int) -> HttpResponse:
     article.is_approved = False
     article.is_published = False
     article.save()
+    bump_content_generation()
+    suggest.article_changed(article)
     return redirect('habr:article_detail', pk=article.pk)
 
 
@@ -403,17 +466,63 @@ def add_comment(request: HttpRequest, pk: int) -> HttpResponse:
     article = get_object_or_404(Article, pk=pk, is_approved=True, is_published=True)
     content = request.POST.get('content', '').strip()
     if content:
-        Comment.objects.create(
-            article=article,
-            user=request.user,
-            content=content
-        )
+        with transaction.atomic():
+            Comment.objects.create(
+                article=article,
+                user=request.user,
+                content=content
+            )
+            counters.bump(article.pk, comment_count=1)
+            # Cached detail pages would hide the new comment
+            bump_content_generation()
     referer = request.META.get("HTTP_REFERER")
     if referer:
         return redirect(referer)
     return redirect("habr:article_detail", pk=article.pk)
 
 
+def article_comments(request: HttpRequest, pk: int) -> HttpResponse:
+    """Next page of comments as an HTML fragment for the detail page's "load more" button"""
+    article = get_object_or_404(Article.objects.only('pk'), pk=pk, is_approved=True, is_published=True)
+    context = {
+        'article': article,
+        'comments': comment_page(article, request.GET.get('cursor')),
+    }
+    return render(request, 'habr/comment_list.html', context)
+
+
+def article_history(request: HttpRequest, pk: int) -> HttpResponse:
+    """An article's revisions, with one of them (the latest by default) rebuilt and diffed against the one before"""
+    article = get_object_or_404(
+        Article.objects.only('pk', 'title', 'author_id', 'is_approved', 'is_published'), pk=pk, is_deleted=False
+    )
+    if not (article.is_approved and article.is_published) and article.author_id != request.user.pk:
+        profile = getattr(request.user, 'profile', None)
+        if not profile or not profile.is_admin:
+            raise Http404("Article not found")
+    
+    history = list(revisions.history(article))
+    numbers = {revision.number: revision for revision in history}
+    requested = request.GET.get('revision', '')
+    selected = numbers.get(int(requested)) if requested.isdigit() else (history[0] if history else None)
+    if history and selected is None:
+        raise Http404("Revision not found")
+    
+    context = {'article': article, 'history': history, 'selected': selected}
+    if selected:
+        previous = numbers.get(selected.number - 1)
+        rebuilt = revisions.versions([revision for revision in (previous, selected) if revision])
+        fields = rebuilt[selected.pk]
+        context['fields'] = fields
+        if previous:
+            changes = revisions.diff_fields(rebuilt[previous.pk], fields)
+            context['changes'] = [
+                (field, deltas.fragments(changes[field])) for field in revisions.TEXT_FIELDS if field in changes
+            ]
+            context['other_changes'] = [field for field in revisions.SCALAR_FIELDS if field in changes]
+    return render(request, 'habr/article_history.html', context)
+
+
 # Admin panel for managing requests
 @login_required
 def admin_panel(request: HttpRequest) -> HttpResponse:
@@ -422,42 +531,74 @@ def admin_panel(request: HttpRequest) -> HttpResponse:
     if not profile or not profile.is_admin:
         return HttpResponseBadRequest("Only admins can access this page")
     
-    edit_requests = ArticleEditRequest.objects.filter(status='PENDING').order_by('-created_at')
-    delete_requests = ArticleDeleteRequest.objects.filter(status='PENDING').order_by('-created_at')
+    # Each queue pages on its own cursor; links keep the other queue's place
+    edit_requests = KeysetPaginator(moderation.edit_queue(), moderation.QUEUE_PAGE_SIZE).page(request.GET.get('edits'))
+    delete_requests = KeysetPaginator(moderation.delete_queue(), moderation.QUEUE_PAGE_SIZE).page(request.GET.get('deletes'))
     
     context = {
         'edit_requests': edit_requests,
         'delete_requests': delete_requests,
+        'edits_cursor': request.GET.get('edits', ''),
+        'deletes_cursor': request.GET.get('deletes', ''),
     }
     return render(request, 'habr/admin_panel.html', context)
 
 
+def selected_ids(request: HttpRequest) -> list:
+    return [int(value) for value in request.POST.getlist('ids') if value.isdigit()]
+
+
+@login_required
+def bulk_edit_requests(request: HttpRequest) -> HttpResponse:
+    if request.method != "POST":
+        return HttpResponseBadRequest("Invalid method")
+    profile = getattr(request.user, 'profile', None)
+    if not profile or not profile.is_admin:
+        return HttpResponseBadRequest("Only admins can moderate requests")
+    
+    action = request.POST.get('action')
+    if action == 'approve':
+        moderation.approve_edit_requests(selected_ids(request), request.user)
+    elif action == 'reject':
+        moderation.reject_edit_requests(
+            selected_ids(request), request.user, request.POST.get('rejection_reason', '').strip()
+        )
+    else:
+        return HttpResponseBadRequest("Unknown action")
+    return redirect('habr:admin_panel')
+
+
+@login_required
+def bulk_delete_requests(request: HttpRequest) -> HttpResponse:
+    if request.method != "POST":
+        return HttpResponseBadRequest("Invalid method")
+    profile = getattr(request.user, 'profile', None)
+    if not profile or not profile.is_admin:
+        return HttpResponseBadRequest("Only admins can moderate requests")
+    
+    action = request.POST.get('action')
+    if action == 'approve':
+        moderation.approve_delete_requests(selected_ids(request), request.user)
+    elif action == 'reject':
+        moderation.reject_delete_requests(
+            selected_ids(request), request.user, request.POST.get('rejection_reason', '').strip()
+        )
+    else:
+        return HttpResponseBadRequest("Unknown action")
+    return redirect('habr:admin_panel')
+
+
 @login_required
 def approve_edit_request(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid method")
-    edit_request = get_object_or_404(ArticleEditRequest, pk=pk)
+    edit_request = get_object_or_404(ArticleEditRequest.objects.only('pk'), pk=pk)
     user = request.user
     profile = getattr(user, 'profile', None)
     if not profile or not profile.is_admin:
         return HttpResponseBadRequest("Only admins can approve requests")
     
-    # Apply the changes to the article
-    article = edit_request.article
-    article.title = edit_request.title
-    article.category = edit_request.category
-    article.image_url = edit_request.image_url
-    article.summary = edit_request.summary
-    article.content = edit_request.content
-    article.is_approved = False  # Needs re-approval
-    article.is_published = False
-    article.save()
-    
-    # Update the request
-    edit_request.status = 'APPROVED'
-    edit_request.reviewed_at = timezone.now()
-    edit_request.reviewed_by = user
-    edit_request.save()
+    moderation.approve_edit_requests([edit_request.pk], user)
     
     return redirect('habr:admin_panel')
 
@@ -466,19 +607,14 @@ def approve_edit_request(request: HttpRequest, pk: int) -> HttpResponse:
 def reject_edit_request(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid method")
-    edit_request = get_object_or_404(ArticleEditRequest, pk=pk)
+    edit_request = get_object_or_404(ArticleEditRequest.objects.only('pk'), pk=pk)
     user = request.user
     profile = getattr(user, 'profile', None)
     if not profile or not profile.is_admin:
         return HttpResponseBadRequest("Only admins can reject requests")
     
     rejection_reason = request.POST.get('rejection_reason', '').strip()
-    
-    edit_request.status = 'REJECTED'
-    edit_request.reviewed_at = timezone.now()
-    edit_request.reviewed_by = user
-    edit_request.rejection_reason = rejection_reason
-    edit_request.save()
+    moderation.reject_edit_requests([edit_request.pk], user, rejection_reason)
     
     return redirect('habr:admin_panel')
 
@@ -487,22 +623,13 @@ def reject_edit_request(request: HttpRequest, pk: int) -> HttpResponse:
 def approve_delete_request(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid method")
-    delete_request = get_object_or_404(ArticleDeleteRequest, pk=pk)
+    delete_request = get_object_or_404(ArticleDeleteRequest.objects.only('pk'), pk=pk)
     user = request.user
     profile = getattr(user, 'profile', None)
     if not profile or not profile.is_admin:
         return HttpResponseBadRequest("Only admins can approve requests")
     
-    # Delete the article
-    article = delete_request.article
-    article_pk = article.pk
-    article.delete()
-    
-    # Update the request
-    delete_request.status = 'APPROVED'
-    delete_request.reviewed_at = timezone.now()
-    delete_request.reviewed_by = user
-    delete_request.save()
+    moderation.approve_delete_requests([delete_request.pk], user)
     
     return redirect('habr:admin_panel')
 
@@ -511,19 +638,14 @@ def approve_delete_request(request: HttpRequest, pk: int) -> HttpResponse:
 def reject_delete_request(request: HttpRequest, pk: int) -> HttpResponse:
     if request.method != "POST":
         return HttpResponseBadRequest("Invalid method")
-    delete_request = get_object_or_404(ArticleDeleteRequest, pk=pk)
+    delete_request = get_object_or_404(ArticleDeleteRequest.objects.only('pk'), pk=pk)
     user = request.user
     profile = getattr(user, 'profile', None)
     if not profile or not profile.is_admin:
         return HttpResponseBadRequest("Only admins can reject requests")
     
     rejection_reason = request.POST.get('rejection_reason', '').strip()
-    
-    delete_request.status = 'REJECTED'
-    delete_request.reviewed_at = timezone.now()
-    delete_request.reviewed_by = user
-    delete_request.rejection_reason = rejection_reason
-    delete_request.save()
+    moderation.reject_delete_requests([delete_request.pk], user, rejection_reason)
     
     return redirect('habr:admin_panel')
 
@@ -591,9 +713,14 @@ def remove_admin_role(request: HttpRequest, pk: int) -> HttpResponse:
 def profile_view(request: HttpRequest) -> HttpResponse:
     user = request.user
     profile = getattr(user, 'profile', None)
-    user_articles = Article.objects.filter(author=user).order_by('-created_at')
-    bookmarks = Bookmark.objects.filter(user=user).select_related('article')
-    liked_articles = user.liked_articles.all()[:10]
+    # Only the columns the profile lists show; article bodies are never loaded here
+    user_articles = Article.objects.filter(author=user, is_deleted=False).select_related('category').only(
+        'title', 'created_at', 'is_approved', 'is_published', 'category__name'
+    ).order_by('-created_at')
+    bookmarks = Bookmark.objects.filter(user=user, article__is_deleted=False).select_related('article__author').only(
+        'article__title', 'article__created_at', 'article__author__username'
+    )
+    liked_articles = user.liked_articles.filter(is_deleted=False).select_related('author').only('title', 'created_at', 'author__username')[:10]
     
     context = {
         'user': user,